@@ -0,0 +1,168 @@
+'''
+my_answer 答案 CSV 读取的一致性与耗时：pyarrow 流式读取与标准库 csv 回退路径对同样的输入给出同样的结果，
+并测量两条路径随行数的耗时。
+
+    python benchmarks/bench_answers.py                       # 样例 + 随机用例核对，10k ~ 1M 行耗时
+    python benchmarks/bench_answers.py --fuzz 5000 --rows 100000
+
+比较的是 process_csv 的结果：成功时比较输出的每一行，失败时比较错误类别（缺失值、重复 id、无法解析、行数不符）。
+核对不一致时打印第一个差异用例并以非零状态退出。未安装 pyarrow 时只测量回退路径。
+'''
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from camp_setting import answers  # noqa: E402
+
+GOLDEN_CASES = [
+    ("plain", b"id,answer\n1,A\n2,B\n"),
+    ("extra columns", b"id,answer,note\n007,A,x\n2,B,\n"),
+    ("None answer", b"id,answer\n1,None\n"),
+    ("<NA> answer", b"id,answer\n1,<NA>\n"),
+    ("NA id", b"id,answer\nNA,A\n"),
+    ("empty answer", b"id,answer\n1,\n"),
+    ("quoted empty", b'id,answer\n1,""\n'),
+    ("quoted NA", b'id,answer\n1,"NA"\n'),
+    ("not NA", b"id,answer\n1,none\n2,NONE\n3, NA\n"),
+    ("too many fields", b"id,answer\n1,A\n2,B,extra\n"),
+    ("every row too long", b"id,answer\n1,A,x\n2,B,y\n"),
+    ("too few fields", b"id,answer,note\n1,A\n"),
+    ("missing answer field", b"id,answer\n1\n"),
+    ("BOM", "﻿id,answer\n01,A\n".encode('utf-8')),
+    ("CRLF", b"id,answer\r\n1,A\r\n2,B\r\n"),
+    ("blank lines", b"id,answer\n\n1,A\n\n2,B\n"),
+    ("newline in value", b'id,answer\n1,"a\nb"\n'),
+    ("quoted comma", b'id,answer\n1,"a,b"\n'),
+    ("duplicate id", b"id,answer\n1,A\n1,B\n"),
+    ("header only", b"id,answer\n"),
+    ("too many rows", b"id,answer\n" + b"".join(b"%d,A\n" % i for i in range(16))),
+    ("not UTF-8", "id,answer\n1,答案\n".encode('gbk')),
+]
+
+# 随机单元格：普通值、缺失值写法、需要加引号的值
+CELLS = ["A", "B", "0", "007", "1.0", "答案", " x", "a b", "a,b", 'say "hi"', "a\nb", "none", "NONE", "N/A",
+         "NA", "None", "<NA>", "null", "nan", "", "#N/A"]
+
+
+class UploadedCsv(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.name = "answer.csv"
+        self.size = len(data)
+
+
+@contextmanager
+def arrow_reader(enabled):
+    """临时切换 answers 模块使用的读取路径"""
+    saved = answers.pa_csv
+    answers.pa_csv = saved if enabled else None
+    try:
+        yield
+    finally:
+        answers.pa_csv = saved
+
+
+def outcome(data, arrow):
+    """process_csv 的结果：成功时为输出行，失败时为错误类别"""
+    with arrow_reader(arrow):
+        try:
+            return ("ok", answers.process_csv(UploadedCsv(data)).values.tolist())
+        except answers.AnswerFileError as e:
+            message = str(e)
+    for kind, marker in (("missing", "缺失值"), ("duplicate", "重复值"), ("parse", "读取文件失败"),
+                         ("rows", "行数过多"), ("rows", "请检查上传文件内容")):
+        if marker in message:
+            return ("error", kind)
+    return ("error", message)
+
+
+def random_csv(rng):
+    columns = ["id", "answer"] + (["note"] if rng.random() < 0.5 else [])
+    rng.shuffle(columns)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator=rng.choice(["\n", "\r\n"]))
+    writer.writerow(columns)
+    for i in range(rng.randint(0, 16)):
+        row = [str(i) if column == "id" and rng.random() < 0.9 else rng.choice(CELLS) for column in columns]
+        shape = rng.random()
+        if shape < 0.05:
+            row.append("extra")
+        elif shape < 0.1:
+            row.pop()
+        elif shape < 0.15:
+            writer.writerow([])
+        writer.writerow(row)
+    data = buffer.getvalue()
+    if rng.random() < 0.1:
+        data = "﻿" + data
+    return data.encode('utf-8')
+
+
+def check(cases):
+    for name, data in cases:
+        arrow, fallback = outcome(data, True), outcome(data, False)
+        if arrow != fallback:
+            print(f"MISMATCH on {name!r}: {data!r}\n  pyarrow:  {arrow}\n  fallback: {fallback}")
+            return False
+    return True
+
+
+def scaling_csv(num_rows):
+    return b"id,answer,note\n" + b"".join(b"%d,answer %d,note\n" % (i, i) for i in range(num_rows))
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def read_all(data):
+    # process_csv 会因行数过多（>15）拒绝大文件，这里只测量读取与逐块校验
+    seen_ids = set()
+    for chunk in answers._iter_answer_chunks(UploadedCsv(data)):
+        answers._validate_chunk(chunk, seen_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='pyarrow / fallback parity and scaling of answer CSV reading.')
+    parser.add_argument('--fuzz', type=int, default=2000, help='Number of random CSV files to compare')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    paths = [("fallback", False)]
+    if answers.pa_csv is not None:
+        rng = random.Random(args.seed)
+        fuzz_cases = [(f"random #{i}", random_csv(rng)) for i in range(args.fuzz)]
+        if not check(GOLDEN_CASES) or not check(fuzz_cases):
+            return 1
+        print(f"pyarrow and fallback agree on {len(GOLDEN_CASES)} golden and {len(fuzz_cases)} random files")
+        paths.insert(0, ("pyarrow", True))
+    else:
+        print("pyarrow is not installed; skipping the parity check")
+
+    print(f"{'rows':>10}" + "".join(f"{name + ' ms':>14}" for name, _ in paths))
+    for num_rows in args.rows:
+        data = scaling_csv(num_rows)
+        timings = []
+        for _, arrow in paths:
+            with arrow_reader(arrow):
+                timings.append(best_of(lambda: read_all(data), args.repeat))
+        print(f"{num_rows:>10}" + "".join(f"{seconds * 1000:>14.1f}" for seconds in timings))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
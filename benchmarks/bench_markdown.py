@@ -0,0 +1,285 @@
+'''
+学习任务 Markdown 加链接的正确性与耗时：以旧版多遍处理的实现为基准，核对单遍实现的输出逐字节一致，并测量随行数的扩展性；
+同时核对实时预览（MarkdownPreview）在连续编辑下与完整转换一致，并测量修改一行后的预览耗时。
+
+    python benchmarks/bench_markdown.py                        # 样例 + 随机用例核对，1k ~ 100k 行耗时
+    python benchmarks/bench_markdown.py --fuzz 5000 --lines 1000 10000
+
+核对不一致时打印第一个差异用例并以非零状态退出。
+'''
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from camp_setting.markdown_links import MarkdownPreview, add_urls_to_markdown  # noqa: E402
+
+
+# 旧版 pages/markdown_url_link_app.py 中的实现，作为对照（逐字保留）
+def legacy_format_markdown(markdown_text):
+    lines = markdown_text.splitlines()
+    formatted_lines = []
+    previous_line_empty = True
+    for line in lines:
+        if line.strip() == "":
+            if not previous_line_empty:
+                formatted_lines.append(line)
+                previous_line_empty = True
+        elif line.strip().startswith("#"):
+            if not previous_line_empty:
+                formatted_lines.append("")
+            formatted_lines.append(line)
+            previous_line_empty = False
+        else:
+            formatted_lines.append(line)
+            previous_line_empty = False
+
+    return "\n".join(formatted_lines).strip()
+
+
+def legacy_add_urls_to_markdown(markdown_text, urls):
+    formatted_markdown = legacy_format_markdown(markdown_text)
+
+    def replace_chinese_number(match):
+        chinese_num = match.group(1)
+        num_map = {"一": "1", "二": "2", "三": "3", "四": "4", "五": "5", "六": "6", "七": "7", "八": "8", "九": "9", "十": "10"}
+        arabic_num = num_map.get(chinese_num, chinese_num)
+        return f"关卡 {arabic_num}"
+
+    lines = formatted_markdown.splitlines()
+    header_pattern = re.compile(r"^(#+)\s*(关卡|通关题)([\u4e00-\u9fa5]*)(.*)")
+
+    linked_markdown_lines = []
+    table_rows = []
+    url_index = 0
+    i = 0
+
+    while i < len(lines):
+        line = lines[i]
+        header_match = header_pattern.match(line)
+        if header_match:
+            level = header_match.group(1)
+            title_prefix = header_match.group(2)
+
+            if title_prefix == "通关题":
+                title_prefix = "关卡"
+                line = re.sub(r"通关题", f"关卡 {len(urls)}", line)
+
+            line = re.sub(r"关卡([\u4e00-\u9fa5]+)", replace_chinese_number, line)
+            line = re.sub(r"(关卡)(\d+)", r"\1 \2", line)
+
+            title_text = line.lstrip("#").strip()
+            title_text = re.sub(r'[:：、]+', '：', title_text, 1)
+
+            if url_index < len(urls):
+                url = urls[url_index]
+                linked_markdown_lines.append(f'{level} [{title_text}]({url})')
+
+                linked_title = f"[{title_text}]({url})"
+                if url_index == 0:
+                    access_condition = "无"
+                    reward = 1
+                elif url_index == len(urls) - 1:
+                    access_condition = f"到达关卡 {url_index + 1}"
+                    reward = 6
+                else:
+                    access_condition = f"到达关卡 {url_index + 1}"
+                    reward = url_index
+                    if url_index == 1:
+                        reward = 1
+                table_rows.append(f"| {linked_title} | {access_condition} | {reward} |")
+
+                i += 1
+                while i < len(lines) and not lines[i].strip().startswith("#"):
+                    text_line = lines[i]
+                    text_line = re.sub(r'(\d+)、', r'\1. ', text_line)
+
+                    stripped_text_line = text_line.strip()
+                    if re.match(r"^[\u4e00-\u9fa5]+:\s*$", stripped_text_line):
+                        if i + 1 < len(lines) and not re.match(r"^\s*[-*]\s", lines[i+1]):
+                            i += 1
+                            continue
+
+                    text_line = re.sub(r"(关卡\s*\d+)([:：、]+)", r"\1：", text_line, 1)
+                    text_line = re.sub(r"^([\u4e00-\u9fa5]+)[:：]+", r"**\1**：", text_line, 1)
+                    text_line = re.sub(r"([\u4e00-\u9fa5])([a-zA-Z0-9.,;?!]+)", r"\1 \2", text_line)
+                    text_line = re.sub(r"([a-zA-Z0-9.,;?!]+)([\u4e00-\u9fa5])", r"\1 \2", text_line)
+
+                    linked_markdown_lines.append(text_line)
+                    i += 1
+
+                if url_index == 0:
+                    linked_markdown_lines.append(f"**关卡材料：**[{urls[url_index]}]({urls[url_index]})（**报名后即可访问，fork 后即可运行教案、写作业**）")
+                else:
+                    linked_markdown_lines.append(f"**关卡材料：**[{urls[url_index]}]({urls[url_index]})（到达关卡 {url_index+1} 后方可访问）")
+
+                url_index += 1
+            else:
+                linked_markdown_lines.append(line)
+                i += 1
+        else:
+            linked_markdown_lines.append(line)
+            i += 1
+
+    table_header = "| 关卡材料链接 | 访问条件 | 闯关鲸币奖励 |"
+    separator = "| :------------- | :-------: | :---------: |"
+    table = "\n".join([table_header, separator] + table_rows)
+
+    intro_text = "🐳：请依次访问下方蓝色超链接的关卡教案材料，点击【Fork】-【运行】，拷贝教案到你的工作台，进入编程界面后点击【运行所有】即可复现教案，编写代码、答题闯关。满分即可晋级至下一关，完成全部关卡即可通关。"
+    separator_line = "\n\n---\n\n"
+    detail_intro_text = "关卡详细介绍如下："
+
+    return f"{intro_text}\n\n{table}{separator_line}{detail_intro_text}\n" + "\n".join(linked_markdown_lines).strip()
+
+
+# 样例：覆盖各条格式化规则与边界情况，期望输出由旧版实现给出
+GOLDEN_CASES = [
+    ("## 关卡一：数据读取\n学习目标:\n1、读取csv文件\n2、使用pandas\n\n\n## 关卡二、清洗\n内容：处理缺失值\n"
+     "## 通关题：综合练习\n关卡3:完成作业", ["https://a/1", "https://a/2", "https://a/3"]),
+    ("  # 关卡十 开头有空格\n正文\n   \n\n# 关卡1 数字\n", ["u1", "u2"]),
+    ("导语 text\n\n## 关卡一\n提示:\n- 列表项\n说明:\n  * 星号列表\n结尾:", ["u1"]),
+    ("## 关卡一\n### 小节标题\n小节正文abc中文\n## 关卡二\n正文", ["u1", "u2"]),
+    ("## 关卡一\n## 关卡二\n## 关卡三", ["u1", "u2"]),
+    ("## 关卡第一部分：：介绍、\n中文English混排,标点!结束?好\n关卡 2、关卡3：：下一关", ["u1"]),
+    ("\r\n\r\n## 通关题\r\n通关题说明 10、20、\r\n\r\n\r\n", ["u1", "u2", "u3"]),
+    ("# 不是关卡的标题\n正文\n## 关卡一\n内容　\n　\n", ["u1"]),
+    ("## 关卡一\n中文:", ["u1"]),
+    ("", ["u1"]),
+]
+
+
+def random_document(rng, num_lines):
+    """随机拼出包含各类规则触发点的文档"""
+    headers = ["## 关卡{}：标题", "# 关卡{} 标题", "### 关卡{}、题目", "## 通关题：总结", "##关卡{}", "# 其他标题",
+               "  ## 关卡{}:空格", "## 关卡第{}章"]
+    bodies = ["学习目标:", "说明：内容", "1、第一步", "- 列表", "  * 星号", "中文abc中文", "abc中文123", "关卡 3、继续",
+              "关卡2：：说明", "plain ascii line.", "", "   ", "　", "要点:  ", "混排,标点!中文?", "10、20、30、",
+              "    代码 code()", "名词：：解释"]
+    numbers = list("一二三四五六七八九十") + ["1", "2", "10", "十一", ""]
+    lines = []
+    for _ in range(num_lines):
+        if rng.random() < 0.15:
+            lines.append(rng.choice(headers).format(rng.choice(numbers)))
+        else:
+            lines.append(rng.choice(bodies))
+    separator = rng.choice(["\n", "\n", "\r\n"])
+    return separator.join(lines) + rng.choice(["", "\n", "\n\n  "])
+
+
+def check(cases, transform=add_urls_to_markdown):
+    for i, (markdown_text, urls) in enumerate(cases):
+        expected = legacy_add_urls_to_markdown(markdown_text, urls)
+        actual = transform(markdown_text, urls)
+        if actual != expected:
+            print(f"mismatch in case {i}: {markdown_text!r} urls={urls!r}")
+            for n, (a, b) in enumerate(zip(expected.splitlines(), actual.splitlines())):
+                if a != b:
+                    print(f"  line {n}\n  legacy: {a!r}\n  new:    {b!r}")
+                    break
+            return False
+    return True
+
+
+def random_edit(rng, markdown_text, urls):
+    """模拟一次编辑：改、插入或删除一行，偶尔改动链接"""
+    lines = markdown_text.split("\n")
+    position = rng.randrange(len(lines) + 1)
+    action = rng.choice(["change", "insert", "delete", "urls"])
+    if action == "change" and position < len(lines):
+        lines[position] = random_document(rng, 1)
+    elif action == "insert":
+        lines.insert(position, random_document(rng, 1))
+    elif action == "delete" and position < len(lines):
+        del lines[position]
+    elif action == "urls":
+        urls = [f"u{n}" for n in range(rng.randint(0, 6))]
+    return "\n".join(lines), urls
+
+
+def check_preview(rng, documents, edits):
+    """同一个 MarkdownPreview 连续处理多次编辑，每一步都与完整转换比较"""
+    preview = MarkdownPreview(max_chunks=64)
+    for markdown_text, urls in documents:
+        for _ in range(edits):
+            if not check([(markdown_text, urls)], lambda text, u: preview.render(text, u)):
+                return False
+            markdown_text, urls = random_edit(rng, markdown_text, urls)
+    return True
+
+
+def scaling_document(num_lines):
+    """接近真实教案的文档：每 20 行一个关卡"""
+    section = ["## 关卡{}：数据分析入门", "学习目标:", "- 掌握pandas读取csv文件", "1、读取数据", "2、清洗数据",
+               "说明：本关卡需要完成3道题目", "关卡{}：：完成后提交", "", "print('hello world')", ""]
+    lines = []
+    while len(lines) < num_lines:
+        n = len(lines) // len(section) + 1
+        lines.extend(line.format(n) for line in section)
+    return "\n".join(lines[:num_lines]), [f"https://www.heywhale.com/mw/project/{n}" for n in range(1, n + 1)]
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Golden-output check and scaling of add_urls_to_markdown.')
+    parser.add_argument('--fuzz', type=int, default=2000, help='Number of random documents to compare')
+    parser.add_argument('--lines', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--edits', type=int, default=10, help='Edits applied to each random document in the preview check')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    fuzz_cases = []
+    for _ in range(args.fuzz):
+        urls = [f"u{n}" for n in range(rng.randint(0, 6))]
+        fuzz_cases.append((random_document(rng, rng.randint(0, 40)), urls))
+    if not check(GOLDEN_CASES) or not check(fuzz_cases):
+        return 1
+    print(f"output identical on {len(GOLDEN_CASES)} golden and {len(fuzz_cases)} random documents")
+    if not check(GOLDEN_CASES, MarkdownPreview().render) or not check_preview(rng, fuzz_cases, args.edits):
+        return 1
+    print(f"preview identical over {len(fuzz_cases) * args.edits} incremental edits")
+
+    print(f"{'lines':>8}{'legacy ms':>12}{'new ms':>10}{'new us/line':>13}{'speedup':>9}")
+    for num_lines in args.lines:
+        markdown_text, urls = scaling_document(num_lines)
+        legacy = best_of(lambda: legacy_add_urls_to_markdown(markdown_text, urls), args.repeat)
+        new = best_of(lambda: add_urls_to_markdown(markdown_text, urls), args.repeat)
+        print(f"{num_lines:>8}{legacy * 1000:>12.1f}{new * 1000:>10.1f}{new / num_lines * 1e6:>13.2f}"
+              f"{legacy / new:>8.1f}x")
+
+    # 实时预览：先完整渲染一次，再在文档中间改一行（每次改成不同内容，避免命中整体结果缓存）
+    print(f"\n{'lines':>8}{'full ms':>10}{'edit ms':>10}{'rerun ms':>10}")
+    for num_lines in args.lines:
+        markdown_text, urls = scaling_document(num_lines)
+        preview = MarkdownPreview()
+        preview.render(markdown_text, urls)
+        lines = markdown_text.split("\n")
+        middle = len(lines) // 2
+        edits = iter(range(10 ** 9))
+
+        def edit():
+            lines[middle] = f"说明：第{next(edits)}次修改"
+            return preview.render("\n".join(lines), urls)
+
+        full = best_of(lambda: add_urls_to_markdown(markdown_text, urls), args.repeat)
+        edited = best_of(edit, args.repeat)
+        rerun = best_of(lambda: preview.render(markdown_text, urls), args.repeat)
+        print(f"{num_lines:>8}{full * 1000:>10.1f}{edited * 1000:>10.1f}{rerun * 1000:>10.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
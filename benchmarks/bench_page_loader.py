@@ -0,0 +1,107 @@
+'''
+页面路由的重跑耗时：用 streamlit AppTest 驱动 set_camp.py，对比旧的"每次重跑读源码 + exec"与缓存代码对象的路由。
+
+    python benchmarks/bench_page_loader.py                 # 两种路由 × 全部页面
+    python benchmarks/bench_page_loader.py --reruns 50 --router cached
+
+每个（路由, 页面）组合在独立的子进程中测量，保证首次渲染包含真实的导入开销：
+    startup  首次运行（默认页面）
+    first    首次切换到该页面
+    warm     之后每次重跑的平均值 / p95
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 旧版 set_camp.py 的路由方式，作为对照
+LEGACY_ROUTER = '''
+import streamlit as st
+import json
+
+pages = {
+    "生成 my_answer csv": "pages/my_answer_csv_generator.py",
+    "批量生成阶段与任务": "pages/batch_stage_and_task_creator.py",
+    "批量生成阶段": "pages/stage_generator.py",
+    "学习任务加链接 🚩": "pages/markdown_url_link_app.py",
+}
+selected_page = st.select_slider("Select a page", options=list(pages.keys()))
+module_path = pages[selected_page]
+if module_path:
+    with open(module_path, "r", encoding="utf-8") as f:
+        exec(f.read())
+'''
+
+
+def measure(router, page, reruns):
+    """在当前进程中测量一个组合（由子进程调用）"""
+    from streamlit.testing.v1 import AppTest
+
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)  # from_string 的脚本位于临时目录，页面需要能导入 camp_setting
+    if router == 'legacy':
+        at = AppTest.from_string(LEGACY_ROUTER, default_timeout=60)
+    else:
+        at = AppTest.from_file(os.path.join(ROOT, 'set_camp.py'), default_timeout=60)
+
+    started = time.perf_counter()
+    at.run()
+    startup = time.perf_counter() - started
+
+    started = time.perf_counter()
+    at.select_slider[0].set_value(page).run()
+    first = time.perf_counter() - started
+
+    warm = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        at.run()
+        warm.append(time.perf_counter() - started)
+    warm.sort()
+    return {
+        "router": router,
+        "page": page,
+        "startup_ms": round(startup * 1000, 1),
+        "first_ms": round(first * 1000, 1),
+        "warm_mean_ms": round(sum(warm) / len(warm) * 1000, 1),
+        "warm_p95_ms": round(warm[min(len(warm) - 1, int(0.95 * len(warm)))] * 1000, 1),
+        "exceptions": [e.value for e in at.exception],
+    }
+
+
+def page_names():
+    # 与 set_camp.py 保持一致的页面顺序
+    return ["生成 my_answer csv", "批量生成阶段与任务", "批量生成阶段", "学习任务加链接 🚩"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold/warm rerun latency of the page router.')
+    parser.add_argument('--router', choices=['legacy', 'cached', 'both'], default='both')
+    parser.add_argument('--reruns', type=int, default=20)
+    parser.add_argument('--child', nargs=2, metavar=('ROUTER', 'PAGE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child[0], args.child[1], args.reruns), ensure_ascii=False))
+        return 0
+
+    routers = ['legacy', 'cached'] if args.router == 'both' else [args.router]
+    print(f"{'router':<8}{'page':<22}{'startup ms':>12}{'first ms':>10}{'warm mean':>11}{'warm p95':>10}")
+    for router in routers:
+        for page in page_names():
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), '--reruns', str(args.reruns),
+                                     '--child', router, page], capture_output=True, text=True, check=True)
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+            print(f"{router:<8}{page:<22}{result['startup_ms']:>12.1f}{result['first_ms']:>10.1f}"
+                  f"{result['warm_mean_ms']:>11.1f}{result['warm_p95_ms']:>10.1f}")
+            for exception in result['exceptions']:
+                print(f"  exception: {exception}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,310 @@
+'''
+各页面在真实规模输入下的重跑耗时与内存峰值：用 streamlit AppTest 无界面驱动页面，网络请求指向本地模拟服务。
+
+    python benchmarks/bench_pages.py                                   # 全部页面
+    python benchmarks/bench_pages.py --pages markdown batch --reruns 20
+    python benchmarks/bench_pages.py --csv-files 200 --md-lines 20000 --stages 60
+    python benchmarks/bench_pages.py --save pages-baseline.json
+    python benchmarks/bench_pages.py --compare pages-baseline.json --tolerance 0.3
+
+每个页面在独立的子进程中测量，cold 包含页面首次运行时的全部导入开销。各页面的阶段：
+    my_answer   cold（首次处理全部上传文件，每个文件的题目数不超过 15）、warm（之后的重跑，命中结果缓存）
+    markdown    cold、render（打开实时预览后首次转换）、warm（输入不变）、edit（每次改动一行正文）
+    stages      cold、create（点击按钮在模拟服务上创建全部阶段）、warm
+    batch       cold、submit（预检全部文件、转存并提交后台任务）、warm（任务结束后展示全部进度与结果）
+
+AppTest 不能上传文件，压测时把 st.file_uploader 替换为按标签返回合成 CSV 文件的函数。
+模拟服务默认不加延迟，客户端限速调到 --rate，测到的主要是页面本身（解析、转换、渲染）的耗时。
+每个阶段输出平均 / p95 耗时与该阶段的常驻内存峰值；--compare 时任一阶段的平均耗时或内存峰值
+比基线高出 tolerance 以上（耗时另需超过 --min-delta-ms）即以非零退出码结束。
+'''
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_markdown import scaling_document  # noqa: E402
+from bench_pipeline import PeakRss  # noqa: E402
+
+PAGES = {
+    "my_answer": "pages/my_answer_csv_generator.py",
+    "markdown": "pages/markdown_url_link_app.py",
+    "stages": "pages/stage_generator.py",
+    "batch": "pages/batch_stage_and_task_creator.py",
+}
+COOKIE = "heywhale.sid.v2=bench; heywhale.sid.v2.sig=bench"
+
+
+class CsvFile(io.BytesIO):
+    """与 UploadedFile 接口一致的内存 CSV 文件"""
+
+    def __init__(self, name, text):
+        super().__init__(text.encode('utf-8'))
+        self.name = name
+        self.size = len(self.getbuffer())
+
+
+def answer_csv(name, rows):
+    return CsvFile(name, "id,answer,note\n" + "".join(f"{i},answer_{i},n\n" for i in range(1, rows + 1)))
+
+
+def patch_file_uploader(files_by_label):
+    """把指定标签的 st.file_uploader 替换为直接返回合成文件（AppTest 无法模拟上传）"""
+    import streamlit as st
+
+    original = st.file_uploader
+
+    def file_uploader(label, *args, **kwargs):
+        if label in files_by_label:
+            return files_by_label[label]
+        return original(label, *args, **kwargs)
+
+    st.file_uploader = file_uploader
+
+
+def widget(elements, label):
+    return next(element for element in elements if element.label == label)
+
+
+def expect_no_errors(at, page):
+    """工作负载本身应当全部成功，否则测到的只是报错路径"""
+    errors = [e.value for e in at.error]
+    if errors:
+        raise RuntimeError(f"{page} page reported errors: {errors[:3]}")
+
+
+class Recorder:
+    """按阶段记录每次重跑的耗时与常驻内存峰值"""
+
+    def __init__(self, page):
+        self.page = page
+        self.phases = {}
+        self.peaks = {}
+
+    def run(self, phase, action):
+        with PeakRss() as rss:
+            started = time.perf_counter()
+            action()
+            elapsed = time.perf_counter() - started
+        self.phases.setdefault(phase, []).append(elapsed)
+        if rss.peak is not None:
+            self.peaks[phase] = max(self.peaks.get(phase, 0.0), rss.peak)
+
+    def results(self):
+        rows = []
+        for phase, timings in self.phases.items():
+            timings = sorted(timings)
+            rows.append({
+                "page": self.page,
+                "phase": phase,
+                "runs": len(timings),
+                "mean_ms": round(sum(timings) / len(timings) * 1000, 1),
+                "p95_ms": round(timings[min(len(timings) - 1, int(0.95 * len(timings)))] * 1000, 1),
+                "peak_rss_mb": round(self.peaks[phase], 1) if phase in self.peaks else None,
+            })
+        return rows
+
+
+def bench_my_answer(at, recorder, args):
+    patch_file_uploader({"上传一个或多个 CSV 文件 (包含 id 和 answer 列)":
+                         [answer_csv(f"answer_{i:03d}.csv", args.csv_rows) for i in range(args.csv_files)]})
+    recorder.run("cold", at.run)
+    expect_no_errors(at, "my_answer")
+    for _ in range(args.reruns):
+        recorder.run("warm", at.run)
+
+
+def bench_markdown(at, recorder, args):
+    recorder.run("cold", at.run)
+    markdown_text, urls = scaling_document(args.md_lines)
+    widget(at.text_area, "Markdown Input").set_value(markdown_text)
+    widget(at.text_area, "URLs Input").set_value("\n".join(urls))
+    widget(at.checkbox, "Live preview").check()
+    recorder.run("render", at.run)
+    expect_no_errors(at, "markdown")
+    if not widget(at.text_area, "Updated Markdown").value:
+        raise RuntimeError("markdown page rendered no output")
+    for _ in range(args.reruns):
+        recorder.run("warm", at.run)
+    lines = markdown_text.split("\n")
+    for n in range(args.reruns):
+        # 只改正文行，标题数与链接数保持一致
+        position = (n * 7919) % len(lines)
+        while lines[position].startswith("#"):
+            position = (position + 1) % len(lines)
+        lines[position] = f"{lines[position]} 修改{n}"
+        widget(at.text_area, "Markdown Input").set_value("\n".join(lines))
+        recorder.run("edit", at.run)
+
+
+def bench_stages(at, recorder, args):
+    recorder.run("cold", at.run)
+    widget(at.text_input, "Competition ID").set_value("bench-stages")
+    widget(at.text_area, "Cookie").set_value(COOKIE)
+    widget(at.number_input, "Number of Stages (n)").set_value(args.stages)
+    widget(at.button, "Create Stages").click()
+    recorder.run("create", at.run)
+    expect_no_errors(at, "stages")
+    if len(at.success) != args.stages:
+        raise RuntimeError(f"stages page created {len(at.success)} of {args.stages} stages")
+    for _ in range(args.reruns):
+        recorder.run("warm", at.run)
+
+
+def bench_batch(at, recorder, args):
+    from camp_setting.jobs import get_job_runner
+
+    answers = [answer_csv(f"answer_{i:03d}.csv", args.batch_rows) for i in range(args.stages)]
+    samples = [answer_csv(f"sample_{i:03d}.csv", min(args.batch_rows, 100)) for i in range(args.stages)]
+    patch_file_uploader({"Upload CSV Answer Files": answers, "Upload CSV Sample Files (Optional)": samples})
+    recorder.run("cold", at.run)
+    widget(at.text_area, "Cookie").set_value(COOKIE)
+    # 末尾多一个分隔符，不应多出一个空的比赛
+    widget(at.text_input, "Competition ID").set_value("bench-batch,")
+    widget(at.number_input, "Number of Stages (n_stage)").set_value(args.stages)
+    widget(at.checkbox, "Resume previous run (skip finished steps)").uncheck()
+    widget(at.button, "Create Stages and Tasks").click()
+    recorder.run("submit", at.run)
+    jobs = get_job_runner().jobs()
+    if not jobs:
+        raise RuntimeError(f"Job was not submitted: {[e.value for e in at.error]}")
+    if jobs[0].meta.get('competition_ids') != ["bench-batch"]:
+        raise RuntimeError(f"Unexpected competition IDs: {jobs[0].meta.get('competition_ids')}")
+    deadline = time.time() + args.timeout
+    while not jobs[0].done:
+        if time.time() > deadline:
+            raise RuntimeError("Timed out waiting for the batch job")
+        time.sleep(0.05)
+    if jobs[0].error is not None:
+        raise RuntimeError(f"Batch job failed: {jobs[0].error}")
+    if any(row['status'] != "created" for row in jobs[0].result):
+        raise RuntimeError(f"Batch job did not create every stage: {jobs[0].result[:3]}")
+    for _ in range(args.reruns):
+        recorder.run("warm", at.run)
+
+
+SCENARIOS = {
+    "my_answer": bench_my_answer,
+    "markdown": bench_markdown,
+    "stages": bench_stages,
+    "batch": bench_batch,
+}
+
+
+def measure(page, args):
+    """在当前进程中测量一个页面（由子进程调用）"""
+    from streamlit.testing.v1 import AppTest
+
+    from mock_server import MockConfig, start_mock_server
+    from camp_setting import heywhale, qiniu
+    from camp_setting.client import get_client
+
+    os.chdir(ROOT)
+    server, _ = start_mock_server(MockConfig(args.latency, 0.0, 0.0, 0.0, 0))
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    heywhale.HEYWHALE_URL = base_url
+    qiniu.QINIU_UP_URL = base_url + '/'
+    get_client().governor(base_url).rate = args.rate
+
+    recorder = Recorder(page)
+    with tempfile.TemporaryDirectory() as home:
+        # 运行日志写到临时目录
+        os.environ['CAMP_SETTING_HOME'] = home
+        at = AppTest.from_file(os.path.join(ROOT, PAGES[page]), default_timeout=args.timeout)
+        SCENARIOS[page](at, recorder, args)
+    server.shutdown()
+    return {"results": recorder.results(), "exceptions": [e.value for e in at.exception]}
+
+
+WORKLOAD = ('reruns', 'csv_files', 'csv_rows', 'md_lines', 'stages', 'batch_rows', 'latency', 'rate')
+
+
+def compare(results, baseline_path, tolerance, min_delta_ms, config=None):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+    baseline = {(r['page'], r['phase']): r for r in saved['results']}
+    regressions = []
+    if config is not None:
+        changed = [name for name in WORKLOAD if saved.get('config', {}).get(name) != config.get(name)]
+        if changed:
+            print(f"NOTE baseline was recorded with a different workload ({', '.join(changed)}), numbers are not comparable")
+    for result in results:
+        base = baseline.get((result['page'], result['phase']))
+        if not base:
+            continue
+        label = f"{result['page']}/{result['phase']}"
+        if (result['mean_ms'] > base['mean_ms'] * (1 + tolerance)
+                and result['mean_ms'] - base['mean_ms'] > min_delta_ms):
+            regressions.append(f"{label}: {base['mean_ms']:.1f}ms -> {result['mean_ms']:.1f}ms")
+        if (result['peak_rss_mb'] is not None and base.get('peak_rss_mb') is not None
+                and result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + tolerance)):
+            regressions.append(f"{label}: peak RSS {base['peak_rss_mb']:.1f}MB -> {result['peak_rss_mb']:.1f}MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold/warm rerun latency and peak memory of every page under AppTest.')
+    parser.add_argument('--pages', nargs='+', choices=list(PAGES), default=list(PAGES))
+    parser.add_argument('--reruns', type=int, default=10)
+    parser.add_argument('--csv-files', type=int, default=50, help='Files uploaded to the my_answer page')
+    parser.add_argument('--csv-rows', type=int, default=15, help='Rows (questions) per my_answer file, at most 15')
+    parser.add_argument('--md-lines', type=int, default=5000, help='Lines of the Markdown document')
+    parser.add_argument('--stages', type=int, default=30, help='Stages created by the stage and batch pages')
+    parser.add_argument('--batch-rows', type=int, default=1000, help='Rows per batch answer file')
+    parser.add_argument('--latency', type=float, default=0.0, help='Mock server latency per request (seconds)')
+    parser.add_argument('--rate', type=float, default=1000.0, help='Client-side request rate limit for the mock host')
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--save', help='Write results to this JSON file')
+    parser.add_argument('--compare', help='Baseline JSON written by --save')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed slowdown / memory growth vs baseline')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0, help='Ignore slowdowns smaller than this')
+    parser.add_argument('--child', choices=list(PAGES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args), ensure_ascii=False))
+        return 0
+
+    child_args = [f'--{name.replace("_", "-")}={getattr(args, name)}' for name in WORKLOAD + ('timeout',)]
+    results = []
+    failed = False
+    print(f"{'page':<11}{'phase':<8}{'runs':>6}{'mean ms':>10}{'p95 ms':>10}{'peak RSS MB':>13}")
+    for page in args.pages:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), *child_args, '--child', page],
+                                capture_output=True, text=True)
+        if output.returncode != 0:
+            print(f"{page:<11}FAILED\n{output.stderr.strip()}")
+            failed = True
+            continue
+        measured = json.loads(output.stdout.strip().splitlines()[-1])
+        for row in measured['results']:
+            peak = f"{row['peak_rss_mb']:.1f}" if row['peak_rss_mb'] is not None else "-"
+            print(f"{row['page']:<11}{row['phase']:<8}{row['runs']:>6}{row['mean_ms']:>10.1f}{row['p95_ms']:>10.1f}{peak:>13}")
+        for exception in measured['exceptions']:
+            print(f"  exception: {exception}")
+            failed = True
+        results.extend(measured['results'])
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({"config": {k: v for k, v in vars(args).items() if k not in ('save', 'compare', 'child')},
+                       "results": results}, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance, args.min_delta_ms, vars(args))
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,202 @@
+'''
+批量创建流程的离线压测：在本地模拟服务上跑 create_stage / create_task_and_upload_file 全流程。
+
+    python benchmarks/bench_pipeline.py                      # 默认 5/20/100 关 × 1KB/1MB/10MB
+    python benchmarks/bench_pipeline.py --stages 20 --sizes 1024 --latency 0.1 --throttle-rate 0.05
+    python benchmarks/bench_pipeline.py --save baseline.json
+    python benchmarks/bench_pipeline.py --compare baseline.json --tolerance 0.2
+    python benchmarks/bench_pipeline.py --stages 10 --sizes 1024 --competitions 1 10 --max-workers 32   # 多比赛并发
+    python benchmarks/bench_pipeline.py --stages 30 --sizes 20000000 --distinct --spool           # 大文件转存到磁盘时的内存峰值
+
+每个场景输出墙钟时间、请求数/秒、运行期间的常驻内存峰值，以及各端点的 p50/p95 延迟（取自追踪 span，客户端视角，含重试的每次尝试）。
+--compare 时任一场景墙钟时间比基线慢超过 tolerance 即以非零退出码结束。
+'''
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_server import MockConfig, start_mock_server  # noqa: E402
+from camp_setting import heywhale, qiniu  # noqa: E402
+from camp_setting.client import get_client  # noqa: E402
+from camp_setting.files import FileSpool  # noqa: E402
+from camp_setting.heywhale import HeyWhaleApi  # noqa: E402
+from camp_setting.journal import RunJournal  # noqa: E402
+from camp_setting.pipeline import run_camp, run_camps  # noqa: E402
+from camp_setting.stages import build_stage_plan, DEFAULT_MAX_WORKERS  # noqa: E402
+from camp_setting.tracing import run_scope  # noqa: E402
+
+
+class SyntheticFile(io.BytesIO):
+    """与 UploadedFile 接口一致的内存文件"""
+
+    def __init__(self, name, size):
+        super().__init__(b'x' * size)
+        self.name = name
+        self.size = size
+
+
+class PeakRss:
+    """运行期间每 10ms 读取一次常驻内存（/proc/self/statm，仅 Linux），记录峰值 MB；其他平台为 None"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    @staticmethod
+    def current():
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+        except (OSError, ValueError):
+            return None
+
+    def _sample(self):
+        while True:
+            rss = self.current()
+            if rss is not None:
+                self.peak = max(self.peak or 0.0, rss)
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_scenario(num_stages, file_size, max_workers, journal_dir, competitions=1, distinct=False, spool=False):
+    if distinct:
+        # 每个关卡各自的文件，与页面上传多个文件一致
+        answers = [SyntheticFile(f'answer_{i}.csv', file_size) for i in range(num_stages)]
+        samples = [SyntheticFile(f'sample_{i}.csv', min(file_size, 64 * 1024)) for i in range(num_stages)]
+    else:
+        answers = [SyntheticFile('answer.csv', file_size)] * num_stages
+        samples = [SyntheticFile('sample.csv', min(file_size, 64 * 1024))] * num_stages
+    file_spool = FileSpool()
+    if spool:
+        # 与页面一致：提交前转存，运行只引用磁盘副本，内存中的原文件随即释放
+        answers = file_spool.add_all(answers, uses=competitions)
+        samples = file_spool.add_all(samples, uses=competitions)
+    plan = build_stage_plan(1, num_stages)
+    api = HeyWhaleApi('mock=1', '')
+    name = f'bench-{num_stages}-{file_size}'
+    args = ('2025-01-01T00:00:00.000Z', '2025-01-08T00:00:00.000Z', 'bench', 10, answers, samples)
+
+    started = time.perf_counter()
+    with file_spool, PeakRss() as rss, run_scope() as tracer:
+        if competitions == 1:
+            journal = RunJournal(os.path.join(journal_dir, f'{name}.jsonl'))
+            rows = run_camp(api, name, plan, *args, max_workers=max_workers, resume=False, journal=journal)
+        else:
+            # 多比赛共用一个调度器，日志按比赛写到 CAMP_SETTING_HOME 下
+            rows = run_camps(api, [f'{name}-{n}' for n in range(competitions)], plan, *args,
+                             max_workers=max_workers, resume=False)
+    wall = time.perf_counter() - started
+
+    summary = tracer.summary()
+    total_requests = sum(row['count'] for row in summary)
+    return {
+        "stages": num_stages,
+        "file_size": file_size,
+        "competitions": competitions,
+        "wall_seconds": round(wall, 3),
+        "requests": total_requests,
+        "requests_per_second": round(total_requests / wall, 1) if wall else 0.0,
+        "failed_stages": sum(1 for row in rows if row['status'] != 'created'),
+        "spooled": spool,
+        "peak_rss_mb": round(rss.peak, 1) if rss.peak is not None else None,
+        "calls": {row['endpoint']: {k: row[k] for k in ('count', 'errors', 'p50_ms', 'p95_ms')} for row in summary},
+    }
+
+
+def print_result(result):
+    print(f"\n== {result['competitions']} competition(s) x {result['stages']} stages, {result['file_size']} byte answer files ==")
+    print(f"wall {result['wall_seconds']:.3f}s, {result['requests']} requests, "
+          f"{result['requests_per_second']:.1f} req/s, failed stages: {result['failed_stages']}, "
+          f"peak RSS {result['peak_rss_mb']} MB{' (spooled)' if result['spooled'] else ''}")
+    print(f"{'endpoint':<72}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, stats in result['calls'].items():
+        print(f"{name:<72}{stats['count']:>7}{stats['errors']:>8}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}")
+
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r.get('competitions', 1), r['stages'], r['file_size']): r for r in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        base = baseline.get((result['competitions'], result['stages'], result['file_size']))
+        if base and result['wall_seconds'] > base['wall_seconds'] * (1 + tolerance):
+            regressions.append(f"{result['competitions']} x {result['stages']} stages / {result['file_size']} bytes: "
+                               f"{base['wall_seconds']:.3f}s -> {result['wall_seconds']:.3f}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline throughput benchmark for the batch stage/task pipeline.')
+    parser.add_argument('--stages', type=int, nargs='+', default=[5, 20, 100])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1024, 1024 * 1024, 10 * 1024 * 1024],
+                        help='Answer file sizes in bytes')
+    parser.add_argument('--competitions', type=int, nargs='+', default=[1],
+                        help='Number of competitions created concurrently from the same template')
+    parser.add_argument('--max-workers', type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument('--distinct', action='store_true', help='Give every stage its own answer/sample file objects')
+    parser.add_argument('--spool', action='store_true', help='Spool files to disk before the run, as the page does')
+    parser.add_argument('--rate', type=float, help='Client-side request rate limit for the mock host (default: client default)')
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--max-concurrency', type=int, default=0)
+    parser.add_argument('--save', help='Write results to this JSON file')
+    parser.add_argument('--compare', help='Baseline JSON written by --save')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed wall time slowdown vs baseline')
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency, args.jitter, args.error_rate, args.throttle_rate, args.max_concurrency)
+    server, state = start_mock_server(config)
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    heywhale.HEYWHALE_URL = base_url
+    qiniu.QINIU_UP_URL = base_url + '/'
+    if args.rate:
+        # 模拟服务只有一个 host，共用一个限速器
+        get_client().governor(base_url).rate = args.rate
+
+    results = []
+    with tempfile.TemporaryDirectory() as journal_dir:
+        # 多比赛场景的运行日志写到 CAMP_SETTING_HOME 下，放在临时目录，避免命中上一次压测的记录
+        os.environ['CAMP_SETTING_HOME'] = journal_dir
+        for competitions in args.competitions:
+            for num_stages in args.stages:
+                for file_size in args.sizes:
+                    result = run_scenario(num_stages, file_size, args.max_workers, journal_dir, competitions,
+                                          distinct=args.distinct, spool=args.spool)
+                    print_result(result)
+                    results.append(result)
+    server.shutdown()
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,223 @@
+'''
+本地模拟的 HeyWhale 管理后台与七牛上传服务，用于离线压测，不会访问线上接口。
+
+    python benchmarks/mock_server.py --port 8765 --latency 0.05 --error-rate 0.01 --throttle-rate 0.02
+
+然后让客户端指向它：
+
+    export HEYWHALE_URL=http://127.0.0.1:8765
+    export QINIU_UP_URL=http://127.0.0.1:8765/
+
+模拟的接口：
+    POST /admin/v2/api/stages            创建阶段
+    GET  /admin/v2/api/stages            列出阶段（?Competition=...）
+    POST /admin/v2/api/tasks             创建任务
+    PUT  /admin/v2/api/tasks/<id>        更新任务
+    GET  /api/uptoken                    上传凭证
+    POST /                               七牛表单上传
+    POST /buckets/<b>/objects/<k>/uploads[/<id>]   七牛分片上传初始化 / 合并
+    PUT  /buckets/<b>/objects/<k>/uploads/<id>/<n> 七牛分片上传
+'''
+import argparse
+import base64
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+
+class MockConfig:
+    """注入的延迟与错误；运行中可以直接修改属性"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, max_concurrency=0,
+                 retry_after=None, upload_bandwidth=0):
+        self.latency = latency                  # 每个请求的基础延迟（秒）
+        self.jitter = jitter                    # 额外的随机延迟上限（秒）
+        self.error_rate = error_rate            # 返回 500 的概率
+        self.throttle_rate = throttle_rate      # 随机返回 429 的概率
+        self.max_concurrency = max_concurrency  # 同时处理的请求超过该值时返回 429，0 表示不限
+        self.retry_after = retry_after          # 429 响应附带的 Retry-After（秒）
+        self.upload_bandwidth = upload_bandwidth  # 上传带宽（字节/秒），0 表示不限
+
+
+def qiniu_etag(data):
+    """七牛 etag：按 4MB 分块做 SHA-1，一块时为 0x16 + SHA-1，否则为 0x96 + SHA-1(各块 SHA-1 拼接)"""
+    block = 4 * 1024 * 1024
+    digests = [hashlib.sha1(data[i:i + block]).digest() for i in range(0, max(len(data), 1), block)]
+    if len(digests) == 1:
+        return base64.urlsafe_b64encode(b'\x16' + digests[0]).decode()
+    return base64.urlsafe_b64encode(b'\x96' + hashlib.sha1(b''.join(digests)).digest()).decode()
+
+
+def form_file_content(body, content_type):
+    """表单上传请求体中 file 字段的内容"""
+    boundary = re.search(r'boundary=([^;\s]+)', content_type or '').group(1).encode()
+    for part in body.split(b'--' + boundary):
+        head, _, content = part.partition(b'\r\n\r\n')
+        if b'name="file"' in head:
+            return content[:-2]  # 去掉结尾的 \r\n
+    return b''
+
+
+def make_uptoken(bucket='mock-bucket', ttl=3600):
+    policy = json.dumps({"scope": bucket, "deadline": int(time.time()) + ttl}).encode()
+    return 'mock-ak:mock-sign:' + base64.urlsafe_b64encode(policy).decode()
+
+
+class MockState:
+    def __init__(self, config):
+        self.config = config
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.stages = []
+        # 分片上传中已收到的分片：{(uploadId, 分片号): 内容}，合并时取出
+        self.parts = {}
+        self.requests = {}
+        self.injected = {"500": 0, "429": 0}
+
+    def next_id(self, prefix):
+        """与线上一样的 24 位 ID：前缀 + 十六进制序号补齐，不截断，保证每个 ID 唯一"""
+        with self.lock:
+            return f"{prefix}{next(self.ids):0{24 - len(prefix)}x}"
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, *args):
+        pass
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        bandwidth = self.state.config.upload_bandwidth
+        if bandwidth and length:
+            time.sleep(length / bandwidth)
+        return body
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method):
+        state = self.state
+        config = state.config
+        with state.lock:
+            state.in_flight += 1
+            over_limit = config.max_concurrency and state.in_flight > config.max_concurrency
+            state.requests[method] = state.requests.get(method, 0) + 1
+        try:
+            body = self._read_body()
+            if over_limit or random.random() < config.throttle_rate:
+                state.injected["429"] += 1
+                headers = {'Retry-After': str(config.retry_after)} if config.retry_after is not None else None
+                return self._send(429, {"error": "too many requests"}, headers)
+            time.sleep(config.latency + random.uniform(0, config.jitter))
+            if random.random() < config.error_rate:
+                state.injected["500"] += 1
+                return self._send(500, {"error": "injected error"})
+            self._route(method, body)
+        finally:
+            with state.lock:
+                state.in_flight -= 1
+
+    def _route(self, method, body):
+        url = urlsplit(self.path)
+        path = url.path
+        state = self.state
+        if method == 'POST' and path == '/admin/v2/api/stages':
+            data = json.loads(body)
+            stage = {"_id": state.next_id('s'), "Name": data.get("Name"), "Competition": data.get("Competition")}
+            with state.lock:
+                state.stages.append(stage)
+            return self._send(200, {"document": stage})
+        if method == 'GET' and path == '/admin/v2/api/stages':
+            competition = parse_qs(url.query).get('Competition', [None])[0]
+            stages = [s for s in state.stages if competition is None or s["Competition"] == competition]
+            return self._send(200, {"documents": stages, "total": len(stages)})
+        if method == 'POST' and path == '/admin/v2/api/tasks':
+            return self._send(200, {"document": {"_id": state.next_id('t'), **json.loads(body)}})
+        if method == 'PUT' and re.fullmatch(r'/admin/v2/api/tasks/\w+', path):
+            return self._send(200, {"document": json.loads(body)})
+        if method == 'GET' and path == '/api/uptoken':
+            return self._send(200, {"uptoken": make_uptoken()})
+        if method == 'POST' and path == '/':
+            content = form_file_content(body, self.headers.get('Content-Type'))
+            return self._send(200, {"hash": qiniu_etag(content), "key": "mock", "size": len(content)})
+        if method == 'POST' and re.fullmatch(r'/buckets/[^/]+/objects/[^/]+/uploads', path):
+            return self._send(200, {"uploadId": state.next_id('u'), "expireAt": int(time.time()) + 7 * 86400})
+        if method == 'PUT' and re.fullmatch(r'/buckets/[^/]+/objects/[^/]+/uploads/[^/]+/\d+', path):
+            upload_id, part_number = path.rsplit('/', 2)[-2:]
+            with state.lock:
+                state.parts[(upload_id, int(part_number))] = body
+            return self._send(200, {"etag": "mock-" + part_number, "md5": ""})
+        if method == 'POST' and re.fullmatch(r'/buckets/[^/]+/objects/[^/]+/uploads/[^/]+', path):
+            upload_id = path.rsplit('/', 1)[-1]
+            numbers = [part["partNumber"] for part in json.loads(body)["parts"]]
+            with state.lock:
+                # 重复合并（客户端重试）时分片已被取走，返回同一结果
+                content = b''.join(state.parts.pop((upload_id, n), b'') for n in numbers)
+                if content:
+                    state.parts[(upload_id, 'hash')] = qiniu_etag(content)
+                etag = state.parts.get((upload_id, 'hash'), qiniu_etag(b''))
+            return self._send(200, {"hash": etag, "key": "mock", "parts": len(numbers)})
+        return self._send(404, {"error": f"no mock for {method} {path}"})
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+
+def start_mock_server(config=None, host='127.0.0.1', port=0):
+    """在后台线程启动模拟服务，返回 (server, state)；server.server_port 为实际端口"""
+    state = MockState(config or MockConfig())
+    handler = type('BoundMockHandler', (MockHandler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local mock of the HeyWhale admin API and Qiniu upload endpoints.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.05, help='Base latency per request in seconds')
+    parser.add_argument('--jitter', type=float, default=0.02, help='Extra random latency upper bound in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probability of a 500 response')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Probability of a 429 response')
+    parser.add_argument('--max-concurrency', type=int, default=0, help='Answer 429 above this many in-flight requests')
+    parser.add_argument('--retry-after', type=float, help='Retry-After seconds sent with 429 responses')
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency, args.jitter, args.error_rate, args.throttle_rate, args.max_concurrency,
+                        args.retry_after)
+    server, _ = start_mock_server(config, args.host, args.port)
+    print(f"Mock HeyWhale/Qiniu server on http://{args.host}:{server.server_port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+"""
+camp_setting 公共模块：供 pages/ 下各 Streamlit 页面共用的批量创建逻辑。
+这里的模块不依赖 streamlit，页面负责展示。
+"""
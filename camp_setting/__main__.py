@@ -0,0 +1,5 @@
+import sys
+
+from camp_setting.cli import main
+
+sys.exit(main())
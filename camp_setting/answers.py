@@ -0,0 +1,301 @@
+"""my_answer CSV 生成：分块读取 id/answer 两列，按题目数分配权重，并行处理多个文件，每个结果只序列化一次，并按内容哈希缓存"""
+import csv
+import hashlib
+import io
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow 可选：没有时退回标准库 csv 分块读取
+    pa = pa_csv = None
+
+# 同时处理的文件数；pandas 解析与序列化大部分时间释放 GIL，线程池即可并行
+DEFAULT_MAX_WORKERS = 4
+
+# 只读取这两列，其余列不加载
+ANSWER_COLUMNS = ['id', 'answer']
+# 分块大小：pyarrow 按字节分块，pandas 按行分块
+ARROW_BLOCK_SIZE = 4 << 20
+CHUNK_ROWS = 100_000
+# 视为缺失值的单元格内容，与 pandas read_csv 默认的集合相同；两条读取路径共用，结果一致
+NA_VALUES = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+])
+# 结果缓存的内存上限（DataFrame + CSV 字节 + ZIP）
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+
+class AnswerFileError(ValueError):
+    """上传的答案文件不符合要求，消息可直接展示给用户"""
+
+
+def calculate_weights(n):
+    """根据行数计算权重列表"""
+    if n == 1:
+        return [100]
+    elif n == 2:
+        return [60, 40]
+    elif n == 3:
+        return [30, 30, 40]
+    elif n == 4:
+        return [30, 30, 30, 10]
+    elif n == 5:
+        return [30, 30, 20, 10, 10]
+    elif n == 6:
+        return [30, 30, 10, 10, 10, 10]
+    elif n == 7:
+        return [30, 20, 10, 10, 10, 10, 10]
+    elif n == 8:
+        return [30, 20, 10, 10, 10, 10, 5, 5]
+    elif n == 9:
+        return [30, 20, 10, 10, 10, 5, 5, 5, 5]
+    elif n == 10:
+        return [30, 20, 10, 10, 5, 5, 5, 5, 5, 5]
+    elif n == 11:
+        return [30, 20, 10, 5, 5, 5, 5, 5, 5, 5, 5]
+    elif n == 12:
+        return [30, 20, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5]
+    elif n == 13:
+        return [30, 10, 10, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5]
+    elif n == 14:
+        return [20, 10, 10, 10, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5]
+    elif n == 15:
+        return [20, 10, 10, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5]
+    elif n > 15:
+        raise ValueError("上传文件行数过多（>15），请手动赋值")
+    elif n < 1:
+        raise ValueError("请检查上传文件内容是否正确")
+    else:
+        return []
+
+
+def _read_header(uploaded_file):
+    """只读表头，确认必需列存在后把文件指针放回开头"""
+    uploaded_file.seek(0)
+    columns = pd.read_csv(uploaded_file, nrows=0).columns
+    uploaded_file.seek(0)
+    return columns
+
+
+def _iter_arrow_chunks(uploaded_file):
+    """pyarrow 流式读取，按 ARROW_BLOCK_SIZE 字节分块"""
+    reader = pa_csv.open_csv(
+        uploaded_file,
+        read_options=pa_csv.ReadOptions(block_size=ARROW_BLOCK_SIZE),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=ANSWER_COLUMNS,
+            column_types={column: pa.string() for column in ANSWER_COLUMNS},
+            null_values=sorted(NA_VALUES),
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in reader:
+        yield batch.to_pandas()
+
+
+def _iter_csv_chunks(uploaded_file):
+    """标准库 csv 逐行读取，按 CHUNK_ROWS 行分块；字段数与表头不一致的行报错，与 pyarrow 相同"""
+    text = io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.reader(text)
+        header = next(reader, [])
+        positions = [header.index(column) for column in ANSWER_COLUMNS]
+        rows = []
+        for row in reader:
+            if not row:
+                # 空行跳过
+                continue
+            if len(row) != len(header):
+                raise ValueError(f"Expected {len(header)} columns, got {len(row)} (line {reader.line_num})")
+            rows.append([None if row[i] in NA_VALUES else row[i] for i in positions])
+            if len(rows) >= CHUNK_ROWS:
+                yield pd.DataFrame(rows, columns=ANSWER_COLUMNS)
+                rows = []
+        if rows:
+            yield pd.DataFrame(rows, columns=ANSWER_COLUMNS)
+    finally:
+        # 不关闭上传文件本身
+        text.detach()
+
+
+def _iter_answer_chunks(uploaded_file):
+    '''
+    逐块读取 id/answer 两列，两列都按字符串读取（保留原文，不做类型推断）；有 pyarrow 时走流式 Arrow 读取。
+    两条路径的结果一致：NA_VALUES 中的内容视为缺失值，字段数与表头不一致的行视为解析错误。
+    '''
+    if pa_csv is not None:
+        yield from _iter_arrow_chunks(uploaded_file)
+    else:
+        yield from _iter_csv_chunks(uploaded_file)
+
+
+def _validate_chunk(chunk, seen_ids):
+    """单块校验缺失值与重复 id（含与之前各块重复），通过后把本块 id 记入 seen_ids"""
+    if chunk.isnull().values.any():
+        raise AnswerFileError("id 或 answer 列存在缺失值，请检查")
+    ids = chunk['id']
+    if ids.duplicated().any() or not seen_ids.isdisjoint(ids):
+        duplicated = ids[ids.duplicated() | ids.isin(seen_ids)]
+        raise AnswerFileError(f"id 列存在重复值（如 {duplicated.iloc[0]}），请检查")
+    seen_ids.update(ids)
+
+
+def process_csv(uploaded_file):
+    """处理上传的CSV文件，返回 id/my_answer/weight 三列的DataFrame；文件不合规时抛出 AnswerFileError
+
+    只读取 id、answer 两列并逐块校验，其余列不会被加载。
+    """
+    try:
+        columns = _read_header(uploaded_file)
+    except Exception as e:
+        raise AnswerFileError(f"读取文件失败, 请确保上传csv文件. 错误信息: {e}") from e
+
+    if 'id' not in columns or 'answer' not in columns:
+        raise AnswerFileError("CSV 文件必须包含 'id' 和 'answer' 列")
+
+    chunks = []
+    seen_ids = set()
+    try:
+        for chunk in _iter_answer_chunks(uploaded_file):
+            _validate_chunk(chunk, seen_ids)
+            chunks.append(chunk)
+    except AnswerFileError:
+        raise
+    except Exception as e:
+        raise AnswerFileError(f"读取文件失败, 请确保上传csv文件. 错误信息: {e}") from e
+
+    if chunks:
+        df = pd.concat(chunks, ignore_index=True)
+    else:
+        df = pd.DataFrame(columns=ANSWER_COLUMNS)
+    df = df.rename(columns={'answer': 'my_answer'})
+
+    n = len(df)
+    try:
+        weights = calculate_weights(n)
+    except ValueError as e:
+        raise AnswerFileError(str(e)) from e
+    df['weight'] = weights + [0] * (n - len(weights))
+    return df
+
+
+def to_csv_bytes(df):
+    """序列化为 UTF-8 CSV 字节，下载按钮与 ZIP 共用这一份"""
+    buffer = io.BytesIO()
+    df.to_csv(buffer, index=False, encoding='utf-8')
+    return buffer.getvalue()
+
+
+def content_digest(uploaded_file):
+    """上传文件内容的哈希，直接读取内存视图，不复制"""
+    with uploaded_file.getbuffer() as view:
+        return hashlib.blake2b(view, digest_size=20).hexdigest()
+
+
+class ResultCache:
+    '''
+    按内容哈希缓存处理结果与 ZIP，跨重跑、跨会话共用（结果只读，不要原地修改 DataFrame）。
+    按最近使用淘汰，总大小不超过 max_bytes；单个结果超过上限时不缓存。
+    '''
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._size}
+
+
+def process_content(uploaded_file):
+    """与文件名无关的处理结果：{df, csv_bytes, error}"""
+    try:
+        df = process_csv(uploaded_file)
+    except AnswerFileError as e:
+        return {"df": None, "csv_bytes": None, "error": str(e)}
+    return {"df": df, "csv_bytes": to_csv_bytes(df), "error": None}
+
+
+def content_size(content):
+    """缓存计量用的大小：DataFrame 内存占用 + CSV 字节数"""
+    if content["df"] is None:
+        return len(content["error"] or "")
+    return int(content["df"].memory_usage(deep=True).sum()) + len(content["csv_bytes"])
+
+
+def process_one(uploaded_file, cache=None):
+    """处理单个文件：{name, output_name, digest, df, csv_bytes, error}；传入 cache 时内容相同的文件不再重复处理"""
+    digest = content_digest(uploaded_file)
+    content = cache.get(('file', digest)) if cache is not None else None
+    if content is None:
+        content = process_content(uploaded_file)
+        if cache is not None:
+            cache.put(('file', digest), content, content_size(content))
+    return {"name": uploaded_file.name, "output_name": f"my_{uploaded_file.name}", "digest": digest, **content}
+
+
+def process_answer_files(uploaded_files, max_workers=DEFAULT_MAX_WORKERS, cache=None):
+    """并行处理多个文件，结果顺序与上传顺序一致"""
+    process = partial(process_one, cache=cache)
+    if len(uploaded_files) <= 1:
+        return [process(f) for f in uploaded_files]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(uploaded_files)))) as executor:
+        return list(executor.map(process, uploaded_files))
+
+
+def zip_bytes(results):
+    """把已序列化的 CSV 字节依次写入 ZIP（不重新渲染 DataFrame）"""
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for result in results:
+            if result["csv_bytes"] is not None:
+                zf.writestr(result["output_name"], result["csv_bytes"])
+    return zip_buffer.getvalue()
+
+
+def build_zip(results, cache=None):
+    """返回可直接交给下载按钮的 BytesIO；传入 cache 时按 (文件名, 内容哈希) 列表缓存 ZIP"""
+    if cache is None:
+        return io.BytesIO(zip_bytes(results))
+    key = ('zip', tuple((result["output_name"], result["digest"]) for result in results))
+    data = cache.get(key)
+    if data is None:
+        data = zip_bytes(results)
+        cache.put(key, data, len(data))
+    return io.BytesIO(data)
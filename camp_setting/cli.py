@@ -0,0 +1,197 @@
+'''
+命令行批量创建入口，不依赖 Streamlit：
+
+    python -m camp_setting run manifest.yaml [--output result.json] [--max-workers 8] [--no-resume]
+                                            [--trace spans.jsonl] [--prom metrics.prom]
+
+manifest（YAML 或 JSON）示例：
+
+    competition_id: 65f0c0ffee0000000000000
+    org_id: ""                       # 可选
+    cookie_env: HEYWHALE_COOKIE      # 从环境变量读取 Cookie；也可直接写 cookie: "..."
+    start_datetime: "2025-01-03T08:00:00.000Z"
+    end_datetime: "2025-01-07T08:00:00.000Z"
+    review_daily_limit: 10
+    submission_notice: 请认真提交，请勿作弊
+    start_stage: 1
+    end_stage: 5
+    awards: [1, 1, 2, 3, 6]          # 可选，默认同页面规则
+    answer_files: answers/*.csv      # 通配符或路径列表，相对 manifest 所在目录，按文件名排序
+    sample_files: samples/*.csv      # 可选
+    max_workers: 8
+    resume: true
+
+结果写入 JSON 文件（默认与 manifest 同名的 .result.json），全部成功时退出码为 0。
+
+学习任务 Markdown 批量加链接（目录或 ZIP，xxx.md 配同名的 xxx.txt 链接列表，见 camp_setting/markdown_batch.py）：
+
+    python -m camp_setting links syllabi/ [--output syllabi-linked.zip] [--max-workers 8]
+
+输出 ZIP 包含转换结果与 report.csv，全部教案都转换成功时退出码为 0。
+'''
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+from camp_setting.files import MappedFile
+from camp_setting.heywhale import HeyWhaleApi
+from camp_setting.markdown_batch import OK, convert_batch, read_directory, read_zip
+from camp_setting.pipeline import run_camp
+from camp_setting.preflight import preflight
+from camp_setting.scheduler import SkippedError
+from camp_setting.stages import DEFAULT_MAX_WORKERS
+from camp_setting.tracing import run_scope
+
+
+def load_manifest(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    if path.endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise SystemExit("PyYAML is required for YAML manifests (pip install pyyaml), or use a JSON manifest.")
+        return yaml.safe_load(text)
+    return json.loads(text)
+
+
+def resolve_files(spec, base_dir):
+    """manifest 中的文件配置（通配符字符串或路径列表）解析为按文件名排序的路径列表"""
+    if not spec:
+        return []
+    patterns = [spec] if isinstance(spec, str) else list(spec)
+    paths = []
+    for pattern in patterns:
+        pattern = os.path.join(base_dir, os.path.expanduser(pattern))
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            raise SystemExit(f"No file matches {pattern}")
+        paths.extend(matches)
+    return sorted(paths, key=os.path.basename)
+
+
+def manifest_cookie(manifest):
+    if manifest.get('cookie'):
+        return manifest['cookie']
+    env_name = manifest.get('cookie_env', 'HEYWHALE_COOKIE')
+    cookie = os.environ.get(env_name)
+    if not cookie:
+        raise SystemExit(f"Cookie not found: set `cookie` in the manifest or the {env_name} environment variable.")
+    return cookie
+
+
+def run(args):
+    manifest = load_manifest(args.manifest)
+    base_dir = os.path.dirname(os.path.abspath(args.manifest))
+    for field in ('competition_id', 'start_datetime', 'end_datetime', 'answer_files'):
+        if not manifest.get(field):
+            raise SystemExit(f"Manifest is missing `{field}`")
+
+    competition_id = str(manifest['competition_id']).strip()
+    answer_paths = resolve_files(manifest['answer_files'], base_dir)
+    sample_paths = resolve_files(manifest.get('sample_files'), base_dir)
+    start_stage = int(manifest.get('start_stage', 1))
+    end_stage = int(manifest.get('end_stage', start_stage + len(answer_paths) - 1))
+    answer_files = [MappedFile(p) for p in answer_paths]
+    sample_files = [MappedFile(p) for p in sample_paths] or None
+    max_workers = args.max_workers or manifest.get('max_workers', DEFAULT_MAX_WORKERS)
+
+    # 预检不通过时不发出任何请求
+    report = preflight(manifest_cookie(manifest), [competition_id], manifest['start_datetime'],
+                       manifest['end_datetime'], start_stage, end_stage, answer_files, sample_files,
+                       awards=manifest.get('awards'), max_workers=max_workers)
+    if not report.ok:
+        raise SystemExit("Preflight failed, nothing was created:\n" + "\n".join(f"  - {e}" for e in report.errors()))
+    plan = report.plan
+    api = HeyWhaleApi(report.cookie_str, str(manifest.get('org_id') or '').strip())
+
+    def log_event(event):
+        if isinstance(event['error'], SkippedError):
+            return
+        label = event['stage'] or competition_id
+        if event['error'] is not None:
+            print(f"[{event['step']}] {label}: FAILED {event['error']}", file=sys.stderr)
+        else:
+            print(f"[{event['step']}] {label}: {'skipped' if event['reused'] else 'ok'}", file=sys.stderr)
+
+    started = time.time()
+    with run_scope() as tracer:
+        rows = run_camp(
+            api, competition_id, plan,
+            manifest['start_datetime'], manifest['end_datetime'],
+            manifest.get('submission_notice', "请认真提交，请勿作弊"),
+            int(manifest.get('review_daily_limit', 10)),
+            answer_files,
+            sample_files,
+            max_workers=max_workers,
+            resume=manifest.get('resume', True) and not args.no_resume,
+            on_event=log_event,
+        )
+    ok = all(row['status'] in ("created", "skipped") for row in rows)
+    result = {
+        "manifest": os.path.abspath(args.manifest),
+        "competition_id": competition_id,
+        "ok": ok,
+        "started_at": started,
+        "elapsed_seconds": round(time.time() - started, 3),
+        "run_id": tracer.run_id,
+        "latency": tracer.summary(),
+        "stages": rows,
+    }
+    output = args.output or os.path.splitext(args.manifest)[0] + '.result.json'
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    if args.trace:
+        with open(args.trace, 'w', encoding='utf-8') as f:
+            f.write(tracer.to_jsonl())
+    if args.prom:
+        with open(args.prom, 'w', encoding='utf-8') as f:
+            f.write(tracer.to_prometheus())
+    print(output)
+    return 0 if ok else 1
+
+
+def links(args):
+    if os.path.isdir(args.source):
+        files = read_directory(args.source)
+    else:
+        with open(args.source, 'rb') as f:
+            files = read_zip(f.read())
+    started = time.time()
+    report, zip_bytes = convert_batch(files, max_workers=args.max_workers)
+    output = args.output or os.path.splitext(os.path.abspath(args.source).rstrip(os.sep))[0] + '-linked.zip'
+    with open(output, 'wb') as f:
+        f.write(zip_bytes)
+    for row in report:
+        if row['status'] != OK:
+            print(f"[{row['status']}] {row['file']}: {row['message']}", file=sys.stderr)
+    converted = sum(1 for row in report if row['status'] == OK)
+    print(f"{converted}/{len(report)} converted in {time.time() - started:.2f}s", file=sys.stderr)
+    print(output)
+    return 0 if converted == len(report) else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m camp_setting', description='Batch create HeyWhale camp stages and tasks.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Create the stages and tasks described by a manifest')
+    run_parser.add_argument('manifest', help='YAML or JSON camp manifest')
+    run_parser.add_argument('--output', help='Result JSON path (default: <manifest>.result.json)')
+    run_parser.add_argument('--max-workers', type=int, help='Maximum concurrent requests')
+    run_parser.add_argument('--no-resume', action='store_true', help='Ignore the local journal and start fresh')
+    run_parser.add_argument('--trace', help='Write one JSON span per HTTP request to this JSONL file')
+    run_parser.add_argument('--prom', help='Write request metrics in Prometheus textfile format to this file')
+    run_parser.set_defaults(func=run)
+
+    links_parser = subparsers.add_parser('links', help='Add URLs to every Markdown syllabus in a folder or ZIP')
+    links_parser.add_argument('source', help='Folder or ZIP with name.md + name.txt (one URL per line) pairs')
+    links_parser.add_argument('--output', help='Result ZIP path (default: <source>-linked.zip)')
+    links_parser.add_argument('--max-workers', type=int, help='Worker processes (default: CPU count)')
+    links_parser.set_defaults(func=links)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
@@ -0,0 +1,129 @@
+"""进程内共享的 HTTP 客户端：按 host 复用 keep-alive 连接池，统一默认超时、限速与重试"""
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from camp_setting.singleton import process_singleton
+from camp_setting.tracing import current_tracer
+from camp_setting.ratelimit import (RateGovernor, RETRY_BUDGET, THROTTLE_STATUSES, retry_after_seconds,
+                                    wait_before_retry)
+
+# (连接超时, 读取超时)，单位秒
+DEFAULT_TIMEOUT = (10, 120)
+# 每个 host 保持的最大连接数，应不小于页面上的最大并发数
+POOL_MAXSIZE = 32
+# 幂等方法：网络错误、超时、5xx 时可以安全重试
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+
+class HttpClient:
+    """对 requests.Session 的薄封装，整个进程共用一个实例，见 get_client()"""
+
+    def __init__(self, pool_maxsize=POOL_MAXSIZE, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self.session = requests.Session()
+        # 不保存服务端下发的 Cookie：同一个 Session 会被多个操作者共用，登录态只通过请求头传递
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.retry_budget = RETRY_BUDGET
+        self._governors = {}
+        self._governors_lock = threading.Lock()
+
+    def governor(self, url):
+        """每个 host 一个限速器"""
+        host = urlsplit(url).netloc
+        with self._governors_lock:
+            if host not in self._governors:
+                self._governors[host] = RateGovernor()
+            return self._governors[host]
+
+    def request(self, method, url, deadline=None, **kwargs):
+        '''
+        发送请求，经过所在 host 的限速器。
+        - 429：所有方法都重试（服务端明确表示未处理该请求）
+        - 网络错误、超时、5xx：只重试幂等方法（GET、PUT 等）
+        请求体是一次性的流（如 MultipartEncoder）时不重试。重试总时长不超过 retry_budget 秒；
+        调用方自己也会重试时传入 deadline（time.monotonic() 时刻），与其共用同一个重试预算。
+        '''
+        kwargs.setdefault('timeout', self.timeout)
+        governor = self.governor(url)
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        replayable = isinstance(kwargs.get('data'), (type(None), bytes, str, memoryview, dict))
+        if deadline is None:
+            deadline = time.monotonic() + self.retry_budget
+        attempt = 0
+        while True:
+            governor.acquire()
+            tracer = current_tracer()
+            started = time.perf_counter()
+            # 任何异常（读响应体出错、重定向过多等）都要归还并发名额，否则后续请求会在 acquire() 中一直等待
+            throttled = False
+            retry_after = None
+            try:
+                response = self.session.request(method, url, **kwargs)
+                if tracer is not None:
+                    tracer.record(method, url, response.status_code,
+                                  bytes_sent=int(response.request.headers.get('Content-Length') or 0),
+                                  bytes_received=len(response.content),
+                                  duration=time.perf_counter() - started)
+                throttled = response.status_code in THROTTLE_STATUSES
+                retry_after = retry_after_seconds(response) if throttled else None
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if tracer is not None:
+                    tracer.record(method, url, duration=time.perf_counter() - started, error=type(e).__name__)
+                governor.release()
+                if not (idempotent and replayable) or not wait_before_retry(attempt, deadline):
+                    raise
+                attempt += 1
+                continue
+            except BaseException:
+                governor.release()
+                raise
+            governor.release(throttled=throttled, retry_after=retry_after)
+
+            retryable = response.status_code == 429 or (idempotent and response.status_code >= 500)
+            if not (retryable and replayable) or not wait_before_retry(attempt, deadline, retry_after):
+                return response
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def connection_stats(self):
+        """统计各连接池的请求数与新建连接数，其余请求复用了已有连接"""
+        total_requests = 0
+        new_connections = 0
+        adapters = {id(a): a for a in self.session.adapters.values()}.values()
+        for adapter in adapters:
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                try:
+                    pool = pools[key]
+                except KeyError:
+                    continue
+                total_requests += pool.num_requests
+                new_connections += pool.num_connections
+        return {
+            "throttled": sum(g.throttled_count for g in list(self._governors.values())),
+            "requests": total_requests,
+            "new_connections": new_connections,
+            "reused_connections": max(0, total_requests - new_connections),
+        }
+
+
+@process_singleton
+def get_client():
+    """返回进程级共享的 HttpClient"""
+    return HttpClient()
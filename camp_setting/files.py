@@ -0,0 +1,120 @@
+"""本地文件包装，接口与 Streamlit 的 UploadedFile 保持一致（name / size / getvalue / getbuffer）"""
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+
+# 不小于该大小的上传文件先写入临时目录，运行期间只保留磁盘副本
+SPOOL_THRESHOLD = 1024 * 1024
+# 写入临时文件时每次复制的字节数
+SPOOL_COPY_SIZE = 1024 * 1024
+
+
+class MappedFile:
+    '''
+    磁盘上的文件，内容不常驻内存：getbuffer() 每次返回整个文件的只读内存映射视图，
+    视图释放（with 块结束）后映射随之解除，已读过的页面可由系统回收。
+    '''
+
+    def __init__(self, path, name=None):
+        self.path = path
+        self.name = name or os.path.basename(path)
+        self.size = os.path.getsize(path)
+
+    def getbuffer(self):
+        if self.size == 0:
+            # 空文件无法映射
+            return memoryview(b'')
+        with open(self.path, 'rb') as f:
+            # 映射不依赖文件描述符，关闭文件后仍可读；memoryview 持有映射对象，释放视图即解除映射
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def getvalue(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+
+class SpooledFile(MappedFile):
+    """FileSpool 写出的临时副本；所有使用者都调用 release() 后删除"""
+
+    def __init__(self, spool, path, name, uses):
+        super().__init__(path, name)
+        self.spool = spool
+        self.uses = uses
+
+    def release(self):
+        self.spool.release(self)
+
+
+class FileSpool:
+    '''
+    运行期间把大的上传文件转存到临时目录，运行只引用磁盘副本，不再持有上传文件本身（转存时逐块写出，不复制整个文件）：
+        with FileSpool() as spool:
+            answer_files = spool.add_all(answer_files, uses=len(competition_ids))
+            ...  # 每个任务上传结束后调用 release_file(file)
+    小于 threshold 的文件原样返回。副本在最后一个使用者 release() 后删除，close() 删除整个临时目录。
+    '''
+
+    def __init__(self, threshold=SPOOL_THRESHOLD, directory=None):
+        self.threshold = threshold
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def add(self, file, uses=1):
+        """返回可替代 file 使用的文件对象（不保留对 file 的引用）"""
+        size = getattr(file, 'size', None)
+        if size is None or size < self.threshold or not hasattr(file, 'getbuffer'):
+            return file
+        with self._lock:
+            if self.directory is None:
+                self.directory = tempfile.mkdtemp(prefix='camp-spool-')
+            fd, path = tempfile.mkstemp(dir=self.directory, suffix=os.path.splitext(file.name)[1])
+        with os.fdopen(fd, 'wb') as f, file.getbuffer() as view:
+            for start in range(0, len(view), SPOOL_COPY_SIZE):
+                with view[start:start + SPOOL_COPY_SIZE] as block:
+                    f.write(block)
+        return SpooledFile(self, path, file.name, uses)
+
+    def add_all(self, files, uses=1):
+        """逐个转存；列表中同一个对象出现多次时共用一个副本，使用次数累加"""
+        if not files:
+            return files
+        spooled = {}
+        for file in files:
+            if id(file) in spooled:
+                spooled_file = spooled[id(file)]
+                if isinstance(spooled_file, SpooledFile):
+                    spooled_file.uses += uses
+            else:
+                spooled[id(file)] = self.add(file, uses)
+        return [spooled[id(file)] for file in files]
+
+    def release(self, spooled_file):
+        with self._lock:
+            spooled_file.uses -= 1
+            if spooled_file.uses > 0:
+                return
+        try:
+            os.remove(spooled_file.path)
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        with self._lock:
+            directory, self.directory = self.directory, None
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def release_file(file):
+    """任务用完文件后调用；FileSpool 的副本计数减一，其他文件不做处理"""
+    release = getattr(file, 'release', None)
+    if release is not None:
+        release()
@@ -0,0 +1,270 @@
+"""HeyWhale 管理后台与七牛云上传接口"""
+import os
+import random
+import string
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+
+import requests
+
+from camp_setting.client import get_client
+from camp_setting.qiniu import file_etag, file_size, upload_file_to_qiniu
+from camp_setting.tracing import submit_in_context
+from camp_setting.uptoken import uptoken_cache
+
+# 可通过环境变量指向本地模拟服务（见 benchmarks/mock_server.py）
+HEYWHALE_URL = os.environ.get('HEYWHALE_URL', 'https://www.heywhale.com').rstrip('/')
+
+
+def generate_random_string(length=10):
+    """生成指定长度的随机字符串"""
+    characters = string.ascii_letters + string.digits
+    return ''.join(random.choice(characters) for _ in range(length))
+
+
+def generate_time_string(year, month, day, hour, minute, second):
+    '''
+    Generate a string in the format "YYYY-MM-DDTHH:MM:SS.000Z" 
+    The inputs are from Asia/Shanghai timezone.
+    Convert the inputs to UTC timezone
+    '''
+    shanghai_tz = timezone(timedelta(hours=8))
+    dt_shanghai = datetime(year, month, day, hour, minute, second, tzinfo=shanghai_tz)
+
+    # Convert to UTC timezone
+    dt_utc = dt_shanghai.astimezone(timezone.utc)
+
+    # Format the datetime as a string in UTC
+    return dt_utc.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def parse_cookie_string(cookie_string):
+    """把浏览器复制的 Cookie 字符串解析为字典"""
+    cookies = {}
+    for item in cookie_string.split(';'):
+        item = item.strip()
+        if not item:
+            continue
+        key, value = item.split('=', 1)
+        cookies[key] = value
+    return cookies
+
+
+class HeyWhaleApi:
+    """绑定一个操作者的 Cookie 与组织 ID，请求走共享的连接池"""
+
+    def __init__(self, cookie_str, org_id="", client=None):
+        self.client = client or get_client()
+        self.headers = {'cookie': cookie_str}
+        if org_id:
+            self.headers['x-kesci-org'] = org_id
+        # 用于按操作者缓存 uptoken 等会话级数据
+        self.cache_key = (cookie_str, org_id)
+
+    def request(self, method, path, **kwargs):
+        headers = {**self.headers, **kwargs.pop('headers', {})}
+        return self.client.request(method, HEYWHALE_URL + path, headers=headers, **kwargs)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+
+def upload_with_cached_token(api, key, file):
+    """使用缓存的 uptoken 上传；七牛返回 401（token 失效）时丢弃缓存、重新获取后再试一次"""
+    token = uptoken_cache.get(api)
+    try:
+        return upload_file_to_qiniu(token, key, file, api.client)
+    except requests.HTTPError as e:
+        if e.response is None or e.response.status_code != 401:
+            raise
+        uptoken_cache.invalidate(api, token)
+        return upload_file_to_qiniu(uptoken_cache.get(api), key, file, api.client)
+
+
+def timed_upload(api, key, file):
+    """上传文件，返回 (七牛的响应内容, 耗时（秒）)"""
+    start = time.perf_counter()
+    result = upload_with_cached_token(api, key, file)
+    return result, time.perf_counter() - start
+
+
+def list_stages(api, competition_id):
+    '''
+    一次请求列出比赛下已有的阶段，返回 ({阶段名: [阶段 ID, ...]}, complete)。
+    兼容接口直接返回列表或以 documents/data 等字段包裹列表两种格式，无法识别的格式抛出 ValueError。
+    Competition 缺失或与 competition_id 不一致的条目不计入。
+    接口可能分页，只有响应中的总数（total/count）表明已列全时 complete 才为 True。
+    '''
+    response = api.get('/admin/v2/api/stages', params={'Competition': competition_id})
+    response.raise_for_status()
+    body = response.json()
+    total = None
+    if isinstance(body, dict):
+        total = next((body[k] for k in ('total', 'totalCount', 'count') if isinstance(body.get(k), int)), None)
+        documents = next((body[k] for k in ('documents', 'data', 'stages', 'list') if isinstance(body.get(k), list)),
+                         None)
+        if documents is None:
+            raise ValueError(f"Unrecognized stage list response: keys {sorted(body)}")
+        body = documents
+    elif not isinstance(body, list):
+        raise ValueError(f"Unrecognized stage list response: {type(body).__name__}")
+    stages = {}
+    for stage in body:
+        competition = stage.get('Competition')
+        if isinstance(competition, dict):
+            competition = competition.get('_id')
+        if competition != competition_id:
+            continue
+        stages.setdefault(stage.get('Name'), []).append(stage['_id'])
+    complete = total is not None and len(body) >= total
+    return stages, complete
+
+
+def create_stage(api, stage_name, start_datetime, end_datetime, award, competition_id):
+    data = {"Name": stage_name,
+            "StartDate": start_datetime,
+            "EndDate": end_datetime,
+            "GroupSync": False,
+            "NeedAgreement": False,
+            "AgreementFields": [],
+            "AuthorizeNotice": "",
+            "AuthorizationLock": False,
+            "AwardWhaleCoin": award,
+            "Competition": competition_id}
+
+    headers = {'Content-Type': 'application/json'}
+    try:
+        response = api.post('/admin/v2/api/stages', headers=headers, json=data)
+        response.raise_for_status()  # 如果请求失败，抛出异常
+        return response
+    except requests.exceptions.ConnectionError as e:
+          raise Exception(f"Network connection error: {e}")
+    except requests.exceptions.Timeout as e:
+          raise Exception(f"Request timeout error: {e}")
+    except Exception as e:
+          raise Exception(f"An unexpected error occurred: {e}")
+
+
+def upload_task_file(api, task_id, kind, file, journal=None):
+    '''
+    上传任务的答案（kind="answer"）或示例（kind="sample"）文件，返回 (文件 URL, 上传耗时)。
+    日志中该任务已上传过同一文件（同名、同大小且七牛 etag 一致）时直接复用，耗时为 0。
+    上传时记录七牛返回的 hash（即内容的 etag），只有续跑时遇到同名、同大小的记录才在本地对文件求哈希。
+    '''
+    size = file_size(file)
+    if journal is not None:
+        url = journal.uploaded_url(kind, file.name, size, lambda: file_etag(file))
+        if url:
+            return url, 0.0
+
+    random_file_name = generate_random_string()
+    if "." in file.name:
+        ext = file.name.split(".")[-1]
+    else:
+        ext = ""
+    url = f'{random_file_name}.{ext}'
+    key = f'tasks/{task_id}/{kind}/{url}'
+    result, seconds = timed_upload(api, key, file)
+    if journal is not None:
+        etag = result.get('hash') if isinstance(result, dict) else None
+        journal.record('file_uploaded', kind=kind, key=key, url=url, file_name=file.name, size=size, etag=etag)
+    return url, seconds
+
+
+def create_task_and_upload_file(api, task_name, start_datetime, end_datetime, stage_id, submission_notice,
+                                review_daily_limit, answer_file, sample_file=None, journal=None):
+    """处理创建任务并上传文件的请求；传入 journal（StageJournal）时记录进度并跳过已完成的步骤"""
+    try:
+        if journal is not None and journal.result:
+            return {**journal.result, "skipped": True}
+
+        # 创建任务
+        task_body = {
+            "Name": task_name,
+            "TaskType": "0",
+            "StartDate": start_datetime,
+            "EndDate": end_datetime,
+            "SubmitDisabled": False,
+            "AllowMemberSubmit": True,
+            "ShowLeaderboard": True,
+            "LeaderboardSortType": 0,
+            "Normalization": False,
+            "ShowPrivateLeaderboard": False,
+            "ShowPrivateBestWork": False,
+            "ObjectiveTaskInfo": {"SubmitType": "token", "AcceptExts": []},
+            "Stage": stage_id
+        }
+
+        task_id = journal.task_id if journal is not None else None
+        if task_id is None:
+            task_response = api.post("/admin/v2/api/tasks", json=task_body)
+            if task_response.status_code != 200:
+                 raise Exception(f"Task creation failed: {task_response.text}")
+            task_response.raise_for_status()
+            task_data = task_response.json()
+            task_id = task_data["document"]["_id"]
+            if journal is not None:
+                journal.record('task_created', task_id=task_id)
+
+        # 答案与示例文件的 key 只依赖 task_id，两个文件同时上传
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            answer_upload = submit_in_context(executor, upload_task_file, api, task_id, 'answer', answer_file, journal)
+            sample_upload = submit_in_context(executor, upload_task_file, api, task_id, 'sample', sample_file, journal) if sample_file else None
+            # 两个上传都结束后才更新任务；任一失败则抛出异常
+            answer_url, answer_seconds = answer_upload.result()
+            sample_url, sample_seconds = sample_upload.result() if sample_upload else (None, None)
+
+        task_body.pop('TaskType')
+        task_body.pop('Stage')
+        # 更新任务信息
+        task_update_body = {
+            **task_body,
+            "SubmissionNotice": submission_notice,
+            "reviewAll": False,
+            "ObjectiveTaskInfo": {
+                "SubmitType": "token",
+                "ReviewLimit": 0,
+                "ReviewDailyLimit": review_daily_limit,
+                "PublicAnswerFileName": answer_file.name,
+                "PublicAnswerFileUrl": answer_url,
+                "AcceptExts": ["csv"],
+                "ReviewLibs": [{"Lib": "60a0d35cca31cd0017836bfa", "Weight": 1, "ShowScoreDetail": True}]
+            }
+        }
+        if sample_file:
+            task_update_body['ObjectiveTaskInfo']['SampleFileName'] = sample_file.name
+            task_update_body['ObjectiveTaskInfo']['SampleFileUrl'] = sample_url
+        update_response = api.put(
+            f'/admin/v2/api/tasks/{task_id}',
+            json=task_update_body
+        )
+        if update_response.status_code != 200:
+            raise Exception(f"Task update failed: {update_response.text}")
+        update_response.raise_for_status()
+
+        # 返回成功信息
+        result = {
+            "msg": "Task created and file uploaded successfully",
+            "id": task_id,
+            "Name": task_name,
+            "answer_file_name": answer_file.name,
+            "sample_file_name": sample_file.name if sample_file else "" ,
+            "sample_file_url": sample_url if sample_file else "",
+            "answer_upload_seconds": answer_seconds,
+            "sample_upload_seconds": sample_seconds
+        }
+        if journal is not None:
+            journal.record('task_completed', task_id=task_id, result=result)
+        return result
+
+    except requests.RequestException as e:
+        return {"error": "External API error", "details": str(e)}, 500
+    except Exception as e:
+        return {"error": "Internal server error", "details": str(e)}, 500
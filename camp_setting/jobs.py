@@ -0,0 +1,107 @@
+"""后台任务：批量运行提交到进程级线程池执行，状态与事件保存在内存中，页面重跑或刷新都不会中断运行"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from camp_setting.singleton import process_singleton
+
+# 同时执行的后台任务数；每个任务内部还有自己的请求并发
+MAX_JOBS = 2
+# 保留的已结束任务数，超出后丢弃最早结束的
+KEEP_FINISHED = 50
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class Job:
+    '''
+    一次后台运行。events 只追加不修改，events_since(index) 返回第 index 条之后的事件（默认全部）；
+    页面的进度区域（st.fragment）每次刷新都会重新输出全部事件，只有该区域重跑，页面其余部分不动。
+    result 为任务函数的返回值，error 为其抛出的异常。
+    '''
+
+    def __init__(self, job_id, title, meta=None):
+        self.id = job_id
+        self.title = title
+        self.meta = meta or {}
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # 任务函数可以在这里放需要在页面上展示的对象（如 tracer、日志路径）
+        self.context = {}
+        self._events = []
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.status in (SUCCEEDED, FAILED)
+
+    def add_event(self, event):
+        with self._lock:
+            self._events.append({**event, "ts": time.time()})
+
+    def events_since(self, index=0):
+        with self._lock:
+            return self._events[index:]
+
+
+class JobRunner:
+    """进程内共用的后台任务执行器，见 get_job_runner()"""
+
+    def __init__(self, max_jobs=MAX_JOBS, keep_finished=KEEP_FINISHED):
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix='camp-job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, title, fn, *args, **meta):
+        '''
+        提交任务，立即返回 Job。fn(job, *args) 在后台线程中执行，
+        可以调用 job.add_event() 报告进度，返回值写入 job.result。
+        '''
+        job = Job(uuid.uuid4().hex[:12], title, meta)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def _run(self, job, fn, args):
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = fn(job, *args)
+            job.status = SUCCEEDED
+        except Exception as e:
+            job.error = e
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """全部任务，最新提交的在前"""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+
+@process_singleton
+def get_job_runner():
+    """返回进程级共享的 JobRunner"""
+    return JobRunner()
@@ -0,0 +1,150 @@
+"""批量创建的本地操作日志（追加写入的 JSONL），中断后重跑时跳过已完成的步骤"""
+import json
+import os
+import threading
+import time
+
+# 本地数据目录，可通过环境变量 CAMP_SETTING_HOME 修改
+DEFAULT_HOME = os.path.join(os.path.expanduser('~'), '.camp_setting')
+
+
+def camp_home():
+    return os.environ.get('CAMP_SETTING_HOME', DEFAULT_HOME)
+
+
+def journal_dir():
+    return os.path.join(camp_home(), 'journals')
+
+
+class RunJournal:
+    '''
+    一个比赛一个日志文件，每行一条记录：
+        {"ts": ..., "event": "stage_created", "stage": "关卡 3", "stage_id": "..."}
+    事件：run_started / stage_created / stage_found / stage_missing / task_created / file_uploaded / task_completed
+    file_uploaded 记录文件名、大小与七牛返回的 etag（hash），续跑时据此判断能否复用已上传的文件。
+    加载时按顺序回放得到每个关卡的当前状态；run_started 且 resume 为 False 时清空之前的状态。
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._needs_newline = False
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._needs_newline = not line.endswith('\n')
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        self._apply(json.loads(line))
+                    except ValueError:
+                        # 进程中断时最后一行可能没写完，忽略即可
+                        continue
+
+    @classmethod
+    def for_competition(cls, competition_id, directory=None):
+        directory = directory or journal_dir()
+        os.makedirs(directory, exist_ok=True)
+        return cls(os.path.join(directory, f'{competition_id}.jsonl'))
+
+    def _state(self, stage_name):
+        return self.stages.setdefault(stage_name, {"stage_id": None, "task_id": None, "uploads": {}, "result": None})
+
+    def _apply(self, entry):
+        event = entry.get('event')
+        if event == 'run_started':
+            if not entry.get('resume', True):
+                self.stages = {}
+            return
+        name = entry.get('stage')
+        if event == 'stage_missing':
+            self.stages.pop(name, None)
+            return
+        state = self._state(name)
+        if event in ('stage_created', 'stage_found'):
+            if state['stage_id'] != entry['stage_id']:
+                state.update(stage_id=entry['stage_id'], task_id=None, uploads={}, result=None)
+        elif event == 'task_created':
+            state.update(task_id=entry['task_id'], uploads={}, result=None)
+        elif event == 'file_uploaded':
+            state['uploads'][entry['kind']] = entry
+        elif event == 'task_completed':
+            state['result'] = entry['result']
+
+    def record(self, event, stage=None, **fields):
+        entry = {"ts": time.time(), "event": event, **fields}
+        if stage is not None:
+            entry['stage'] = stage
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                # 上次中断留下的半行单独成行，避免和新记录粘在一起
+                f.write(('\n' if self._needs_newline else '') + line + '\n')
+                self._needs_newline = False
+                f.flush()
+                os.fsync(f.fileno())
+            self._apply(entry)
+
+    def start_run(self, resume=True, **info):
+        self.record('run_started', resume=resume, **info)
+
+    def reconcile(self, remote_stages, complete=False):
+        '''
+        用服务端已有的阶段 {阶段名: [阶段 ID, ...]} 校正日志：
+        - 服务端已有但日志中没有记录的同名阶段，直接复用，不再重复创建
+        - complete 为 True（列表确定已列全）时，日志里的阶段在服务端已不存在（被手动删除）则丢弃该关卡的全部进度；
+          列表可能不全（分页）时不据此丢弃进度
+        '''
+        if complete:
+            for name in list(self.stages):
+                stage_id = self.stages[name]['stage_id']
+                if stage_id and stage_id not in remote_stages.get(name, []):
+                    self.record('stage_missing', stage=name, stage_id=stage_id)
+        for name, ids in remote_stages.items():
+            if ids and not self._state(name)['stage_id']:
+                self.record('stage_found', stage=name, stage_id=ids[0])
+
+    def stage(self, stage_name):
+        return StageJournal(self, stage_name)
+
+
+class StageJournal:
+    """某个关卡在日志中的进度视图，传给 create_task_and_upload_file"""
+
+    def __init__(self, journal, stage_name):
+        self.journal = journal
+        self.stage_name = stage_name
+
+    @property
+    def state(self):
+        return self.journal._state(self.stage_name)
+
+    @property
+    def stage_id(self):
+        return self.state['stage_id']
+
+    @property
+    def task_id(self):
+        return self.state['task_id']
+
+    @property
+    def result(self):
+        return self.state['result']
+
+    def uploaded_url(self, kind, file_name, size, etag=None):
+        '''
+        该任务已上传过同一文件时返回其 URL，否则返回 None。先按同名、同大小判断；
+        记录中有 etag 时再调用 etag()（返回当前文件的七牛 etag）比较内容，同名、同大小但内容被替换的文件会重新上传。
+        etag() 只在需要比较内容时调用，首次运行或文件已改名、大小变化时不必对文件求哈希。
+        '''
+        upload = self.state['uploads'].get(kind)
+        if not upload or upload.get('file_name') != file_name or upload.get('size') != size:
+            return None
+        if etag is not None and upload.get('etag') is not None and upload['etag'] != etag():
+            return None
+        return upload['url']
+
+    def record(self, event, **fields):
+        self.journal.record(event, stage=self.stage_name, **fields)
@@ -0,0 +1,158 @@
+'''
+学习任务 Markdown 批量加链接：一个目录（或 ZIP）里的多份教案一次处理。
+
+每份教案 xxx.md 配一个同名的链接列表 xxx.txt（每行一个 URL，顺序与标题一致），可以放在子目录里：
+
+    term-2025/
+        python-camp.md
+        python-camp.txt
+        pandas/week1.md
+        pandas/week1.txt
+
+每份教案独立做与单篇页面相同的校验与转换，文件较多较大时放到进程池中并行；
+结果为每份教案一行的报告，以及包含全部转换结果与 report.csv 的 ZIP（目录结构不变）。
+'''
+import csv
+import io
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from camp_setting.markdown_links import add_urls_to_markdown, check_inputs, parse_urls
+
+MARKDOWN_SUFFIXES = ('.md', '.markdown')
+URL_SUFFIX = '.txt'
+# 总大小小于该值时直接在当前进程处理：单份教案的转换只需毫秒级，进程启动与传输反而更慢
+PROCESS_POOL_MIN_BYTES = 2 * 1024 * 1024
+# 子进程的启动方式：Streamlit 服务进程是多线程的，fork 出的子进程可能继承被其他线程持有的锁而卡死
+POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+REPORT_NAME = 'report.csv'
+REPORT_COLUMNS = ['file', 'urls_file', 'status', 'headers', 'urls', 'message']
+
+OK = "ok"
+INVALID = "invalid"
+FAILED = "failed"
+
+
+def read_zip(data):
+    """ZIP 中的全部文件：{相对路径: 字节}，跳过目录与 macOS 的附加文件"""
+    files = {}
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        for info in zf.infolist():
+            name = info.filename
+            if info.is_dir() or name.startswith('__MACOSX/') or os.path.basename(name).startswith('._'):
+                continue
+            files[name] = zf.read(info)
+    return files
+
+
+def read_directory(path):
+    """目录（含子目录）中的全部文件：{相对路径（用 / 分隔）: 字节}"""
+    files = {}
+    for root, _, names in os.walk(path):
+        for name in names:
+            full_path = os.path.join(root, name)
+            with open(full_path, 'rb') as f:
+                files[os.path.relpath(full_path, path).replace(os.sep, '/')] = f.read()
+    return files
+
+
+def pair_documents(files):
+    '''
+    按文件名把教案与链接列表配对，返回 (documents, unmatched)：
+        documents  [(教案路径, 链接文件路径, 教案字节, 链接字节), ...]，按路径排序
+        unmatched  没有对应教案的链接文件或其他文件的报告行（教案缺少链接文件的情况在 documents 中，链接文件为 None）
+    '''
+    documents = []
+    used = set()
+    for name in sorted(files):
+        stem, suffix = os.path.splitext(name)
+        if suffix.lower() not in MARKDOWN_SUFFIXES:
+            continue
+        urls_name = stem + URL_SUFFIX
+        if urls_name not in files:
+            urls_name = None
+        else:
+            used.add(urls_name)
+        documents.append((name, urls_name, files[name], files.get(urls_name)))
+    unmatched = [report_row(name, None, INVALID, message="没有同名的 .md 教案，已忽略")
+                 for name in sorted(files) if name.endswith(URL_SUFFIX) and name not in used]
+    return documents, unmatched
+
+
+def report_row(file, urls_file, status, headers=None, urls=None, message=""):
+    return {"file": file, "urls_file": urls_file, "status": status, "headers": headers, "urls": urls,
+            "message": message}
+
+
+def decode(data):
+    # 兼容带 BOM 的 UTF-8（Windows 记事本保存的文件）
+    return data.decode('utf-8-sig')
+
+
+def convert_document(document):
+    '''
+    校验并转换一份教案，返回 (报告行, 转换结果或 None)。
+    在进程池的子进程中执行，参数与返回值都只包含可序列化的基本类型。
+    '''
+    name, urls_name, markdown_data, url_data = document
+    if urls_name is None:
+        return report_row(name, None, INVALID, message=f"缺少链接文件 {os.path.splitext(name)[0]}{URL_SUFFIX}"), None
+    try:
+        markdown_text = decode(markdown_data)
+        urls = parse_urls(decode(url_data))
+    except UnicodeDecodeError as e:
+        return report_row(name, urls_name, INVALID, message=f"文件不是 UTF-8 编码：{e}"), None
+
+    headers = sum(1 for line in markdown_text.splitlines() if line.strip().startswith("#"))
+    problem = check_inputs(markdown_text, urls)
+    if problem:
+        return report_row(name, urls_name, INVALID, headers, len(urls), problem), None
+    try:
+        output = add_urls_to_markdown(markdown_text, urls)
+    except Exception as e:
+        return report_row(name, urls_name, FAILED, headers, len(urls), str(e)), None
+    return report_row(name, urls_name, OK, headers, len(urls)), output
+
+
+def convert_documents(documents, max_workers=None, min_pool_bytes=PROCESS_POOL_MIN_BYTES):
+    '''
+    逐份校验并转换，返回 [(报告行, 转换结果或 None), ...]，顺序与 documents 一致。
+    总大小不小于 min_pool_bytes 时使用进程池（max_workers 默认为 CPU 数），否则在当前进程中处理。
+    '''
+    total = sum(len(document[2]) + len(document[3] or b'') for document in documents)
+    if len(documents) <= 1 or total < min_pool_bytes or max_workers == 1:
+        return [convert_document(document) for document in documents]
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             mp_context=multiprocessing.get_context(POOL_START_METHOD)) as executor:
+        # 每个任务带上若干份教案，减少进程间往返
+        chunksize = max(1, len(documents) // ((max_workers or os.cpu_count() or 1) * 4))
+        return list(executor.map(convert_document, documents, chunksize=chunksize))
+
+
+def report_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=REPORT_COLUMNS)
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode('utf-8-sig')
+
+
+def convert_batch(files, max_workers=None):
+    '''
+    批量转换 {相对路径: 字节}（见 read_zip / read_directory），返回 (report, zip_bytes)：
+    report 为每个文件一行的报告（教案按路径排序，之后是未配对的链接文件），
+    ZIP 中为全部转换成功的教案（路径与输入相同）以及 report.csv。
+    '''
+    documents, unmatched = pair_documents(files)
+    converted = convert_documents(documents, max_workers=max_workers)
+    report = [row for row, _ in converted] + unmatched
+
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for (name, *_), (_, output) in zip(documents, converted):
+            if output is not None:
+                zf.writestr(name, output.encode('utf-8'))
+        zf.writestr(REPORT_NAME, report_csv(report))
+    return report, zip_buffer.getvalue()
@@ -0,0 +1,323 @@
+"""学习任务 Markdown 加链接：逐行单遍处理，规则全部预编译，输出与原先多遍处理的版本逐字节一致"""
+import re
+import threading
+from collections import OrderedDict
+from itertools import compress, repeat
+from operator import contains
+
+NUM_MAP = {"一": "1", "二": "2", "三": "3", "四": "4", "五": "5", "六": "6", "七": "7", "八": "8", "九": "9", "十": "10"}
+
+HEADER_PATTERN = re.compile(r"^(#+)\s*(关卡|通关题)([\u4e00-\u9fa5]*)(.*)")
+
+# 标题规则
+PASS_TITLE = re.compile(r"通关题")
+CHINESE_LEVEL = re.compile(r"关卡([\u4e00-\u9fa5]+)")
+LEVEL_DIGITS = re.compile(r"(关卡)(\d+)")
+TITLE_COLON = re.compile(r'[:：、]+')
+
+# 正文规则
+NUMBER_COMMA = re.compile(r'(\d+)、')
+EMPTY_LABEL = re.compile(r"^[\u4e00-\u9fa5]+:\s*$")
+LIST_ITEM = re.compile(r"^\s*[-*]\s")
+LEVEL_COLON = re.compile(r"(关卡\s*\d+)([:：、]+)")
+LEADING_LABEL = re.compile(r"^([\u4e00-\u9fa5]+)[:：]+")
+# 中文与英文数字/标点相邻处插入空格（两个方向一次替换完成）
+CJK_ASCII_BOUNDARY = re.compile(r"(?<=[\u4e00-\u9fa5])(?=[a-zA-Z0-9.,;?!])|(?<=[a-zA-Z0-9.,;?!])(?=[\u4e00-\u9fa5])")
+
+TABLE_HEADER = "| 关卡材料链接 | 访问条件 | 闯关鲸币奖励 |"
+TABLE_SEPARATOR = "| :------------- | :-------: | :---------: |"
+INTRO_TEXT = "🐳：请依次访问下方蓝色超链接的关卡教案材料，点击【Fork】-【运行】，拷贝教案到你的工作台，进入编程界面后点击【运行所有】即可复现教案，编写代码、答题闯关。满分即可晋级至下一关，完成全部关卡即可通关。"
+SEPARATOR_LINE = "\n\n---\n\n"
+DETAIL_INTRO_TEXT = "关卡详细介绍如下："
+
+
+def formatted_lines(markdown_text):
+    '''
+    逐行产出格式化后的文本：删除多余的空行，仅在标题前保留一个空行；整体去掉首尾空白。
+    连续空行最多一行，因此只需暂存两行即可在结尾处理末尾空白。
+    '''
+    previous_line_empty = True
+    first = True
+    held = []
+    for line in markdown_text.splitlines():
+        stripped = line.strip()
+        if stripped == "":  # 当前行是空行
+            if previous_line_empty:
+                continue
+            previous_line_empty = True
+        else:
+            if stripped.startswith("#") and not previous_line_empty:  # 标题前补一个空行
+                held.append("")
+            if first:
+                line = line.lstrip()
+                first = False
+            previous_line_empty = False
+        held.append(line)
+        while len(held) > 2:
+            yield held.pop(0)
+    if held and held[-1].strip() == "":
+        held.pop()
+    if held:
+        held[-1] = held[-1].rstrip()
+    yield from held
+
+
+def replace_chinese_number(match):
+    return f"关卡 {NUM_MAP.get(match.group(1), match.group(1))}"
+
+
+def format_header(line, header_match, url_count):
+    """标题中的通关题改为关卡 N、中文数字改为阿拉伯数字，并确保"关卡"与数字之间有一个空格"""
+    if header_match.group(2) == "通关题":
+        line = PASS_TITLE.sub(f"关卡 {url_count}", line)
+    line = CHINESE_LEVEL.sub(replace_chinese_number, line)
+    return LEVEL_DIGITS.sub(r"\1 \2", line)
+
+
+def header_title(line):
+    """标题文本，只保留一个中文冒号"""
+    return TITLE_COLON.sub('：', line.lstrip("#").strip(), 1)
+
+
+def is_empty_label(line, next_line):
+    """"中文:" 后为空的段落，且下一行不是列表时删除；最后一行不删除"""
+    return (next_line is not None and EMPTY_LABEL.match(line.strip()) is not None
+            and not LIST_ITEM.match(next_line))
+
+
+def format_body_line(line):
+    """正文一行的格式化规则；纯 ASCII 行不受任何规则影响，直接返回"""
+    if line.isascii():
+        return line
+    if "、" in line:
+        line = NUMBER_COMMA.sub(r'\1. ', line)
+    if "关卡" in line:
+        line = LEVEL_COLON.sub(r"\1：", line, 1)
+    line = LEADING_LABEL.sub(r"**\1**：", line, 1)
+    return CJK_ASCII_BOUNDARY.sub(" ", line)
+
+
+def table_row(title_text, url, url_index, url_count):
+    if url_index == 0:
+        access_condition = "无"
+        reward = 1
+    elif url_index == url_count - 1:
+        access_condition = f"到达关卡 {url_index + 1}"
+        reward = 6
+    else:
+        access_condition = f"到达关卡 {url_index + 1}"
+        reward = 1 if url_index == 1 else url_index
+    return f"| [{title_text}]({url}) | {access_condition} | {reward} |"
+
+
+def material_line(url, url_index):
+    """关卡结尾的材料段落"""
+    if url_index == 0:
+        return f"**关卡材料：**[{url}]({url})（**报名后即可访问，fork 后即可运行教案、写作业**）"
+    return f"**关卡材料：**[{url}]({url})（到达关卡 {url_index+1} 后方可访问）"
+
+
+def summary(table_rows):
+    """正文前的说明文字与关卡表格"""
+    table = "\n".join([TABLE_HEADER, TABLE_SEPARATOR] + table_rows)
+    return f"{INTRO_TEXT}\n\n{table}{SEPARATOR_LINE}{DETAIL_INTRO_TEXT}\n"
+
+
+def parse_urls(url_text):
+    """每行一个 URL，去掉首尾空白与空行"""
+    return [url.strip() for url in url_text.splitlines() if url.strip()]
+
+
+def check_inputs(markdown_text, urls):
+    """转换前的校验：返回可直接展示的提示，通过时为 None"""
+    if not markdown_text.strip() or not urls:
+        return "Please provide both markdown text and URLs."
+    header_count = sum(1 for line in markdown_text.splitlines() if line.strip().startswith("#"))
+    if header_count == 0:
+        return "Markdown input must contain at least one header."
+    if header_count != len(urls):
+        return "The number of markdown headers must match the number of URLs."
+    return None
+
+
+def add_urls_to_markdown(markdown_text, urls):
+    '''
+    为 Markdown 标题添加 URL 链接，并应用其他格式化规则，并生成表格。
+    第 i 个"关卡/通关题"标题对应 urls[i]，标题下直到下一个以 # 开头的行为该关卡正文；
+    第一个关卡之前的内容原样保留；链接用完之后的关卡标题只改写编号，不加链接。
+    '''
+    linked_markdown_lines = []
+    table_rows = []
+    url_index = 0
+    in_section = False
+
+    lines = formatted_lines(markdown_text)
+    line = next(lines, None)
+    while line is not None:
+        next_line = next(lines, None)
+        if in_section:
+            if not line.strip().startswith("#"):
+                if not is_empty_label(line, next_line):
+                    linked_markdown_lines.append(format_body_line(line))
+                line = next_line
+                continue
+            linked_markdown_lines.append(material_line(urls[url_index], url_index))
+            url_index += 1
+            in_section = False
+
+        header_match = HEADER_PATTERN.match(line)
+        if header_match:
+            line = format_header(line, header_match, len(urls))
+        if header_match and url_index < len(urls):
+            title_text = header_title(line)
+            url = urls[url_index]
+            linked_markdown_lines.append(f'{header_match.group(1)} [{title_text}]({url})')
+            table_rows.append(table_row(title_text, url, url_index, len(urls)))
+            in_section = True
+        else:
+            linked_markdown_lines.append(line)
+        line = next_line
+
+    if in_section:
+        linked_markdown_lines.append(material_line(urls[url_index], url_index))
+
+    return summary(table_rows) + "\n".join(linked_markdown_lines).strip()
+
+
+def format_chunk(lines, first, last):
+    '''
+    格式化一个分块（第一个分块为首个 # 行之前的内容，其余每块从一个 # 行开始）。
+    每块都从"上一行为空"开始处理；非最后一块以非空行结尾时补一个空行，相当于下一个标题前插入的空行。
+    first 表示之前的分块都没有输出（需要去掉文档开头的空白），last 表示最后一块（去掉文档结尾的空白）。
+    '''
+    formatted = []
+    previous_line_empty = True
+    for line in lines:
+        if line.strip() == "":
+            if previous_line_empty:
+                continue
+            previous_line_empty = True
+        else:
+            if first:
+                line = line.lstrip()
+                first = False
+            previous_line_empty = False
+        formatted.append(line)
+    if last:
+        if formatted and formatted[-1].strip() == "":
+            formatted.pop()
+        if formatted:
+            formatted[-1] = formatted[-1].rstrip()
+    elif formatted and not previous_line_empty:
+        formatted.append("")
+    return tuple(formatted)
+
+
+def link_body(body, last):
+    """关卡正文的格式化结果；非最后一块的末行之后还有下一个标题"""
+    linked = []
+    for j, line in enumerate(body):
+        if j + 1 < len(body):
+            next_line = body[j + 1]
+        else:
+            next_line = None if last else ""
+        if not is_empty_label(line, next_line):
+            linked.append(format_body_line(line))
+    return tuple(linked)
+
+
+def link_header(line, url_count):
+    """标题行改写后的 (标题行, 标题级别, 标题文本)；不是关卡标题时级别与标题文本为 None"""
+    header_match = HEADER_PATTERN.match(line)
+    if not header_match:
+        return line, None, None
+    line = format_header(line, header_match, url_count)
+    return line, header_match.group(1), header_title(line)
+
+
+class MarkdownPreview:
+    '''
+    实时预览用的增量版 add_urls_to_markdown，输出与之逐字节一致。
+    - 整体结果按 (markdown, urls) 缓存，输入不变的重跑直接返回
+    - 文本按 # 行切成分块，每块的输出按 (分块原文, 链接, 序号) 缓存，未改动的关卡只做一次查找和拼接
+    - 序号或链接变化（如在前面插入关卡）时，分块格式化、标题改写与正文转换仍各自命中缓存，只重新生成链接、表格行与材料段落
+    '''
+
+    def __init__(self, max_results=32, max_chunks=4096):
+        self.max_results = max_results
+        self.max_chunks = max_chunks
+        self._results = OrderedDict()
+        self._chunks = OrderedDict()
+        self._bodies = OrderedDict()
+        self._headers = OrderedDict()
+        self._sections = OrderedDict()
+        # 进程内共用一个实例，多个会话会同时读写缓存；计算在锁外进行（render 的计算中还会嵌套查找分块缓存）
+        self._lock = threading.Lock()
+
+    def _cached(self, cache, limit, key, compute):
+        with self._lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+                return value
+        value = compute()
+        with self._lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > limit:
+                cache.popitem(last=False)
+        return value
+
+    def render(self, markdown_text, urls):
+        urls = tuple(urls)
+        return self._cached(self._results, self.max_results, (markdown_text, urls),
+                            lambda: self._render(markdown_text, urls))
+
+    def _link_section(self, chunk, first, last, url, url_index, url_count, limit):
+        """一个 # 行开头的分块的输出行与表格行（不是关卡标题或链接已用完时表格行为 None）"""
+        formatted = self._cached(self._chunks, limit, (chunk, first, last),
+                                 lambda: format_chunk(chunk, first, last))
+        body = formatted[1:]
+        line, level, title_text = self._cached(self._headers, limit, (formatted[0], url_count),
+                                               lambda: link_header(formatted[0], url_count))
+        if level is None or url is None:
+            return (line, *body), None
+        linked_body = self._cached(self._bodies, limit, (body, last), lambda: link_body(body, last))
+        section = (f'{level} [{title_text}]({url})', *linked_body, material_line(url, url_index))
+        return section, table_row(title_text, url, url_index, url_count)
+
+    def _render(self, markdown_text, urls):
+        lines = markdown_text.splitlines()
+        # 先用 C 层的 "#" in line 筛出候选行，再确认去掉行首空白后以 # 开头
+        candidates = compress(range(len(lines)), map(contains, lines, repeat("#")))
+        bounds = [0, *(i for i in candidates if lines[i].lstrip()[:1] == "#"), len(lines)]
+        chunk_count = len(bounds) - 1
+        # 缓存至少能容纳当前文档的全部分块，否则长文档每次都会把自己的分块挤出去
+        limit = max(self.max_chunks, 2 * chunk_count)
+        linked_markdown_lines = []
+        table_rows = []
+        url_index = 0
+        first = True
+
+        for k in range(chunk_count):
+            chunk = tuple(lines[bounds[k]:bounds[k + 1]])
+            last = k == chunk_count - 1
+            if k == 0:
+                # 第一个标题之前的内容原样保留
+                formatted = self._cached(self._chunks, limit, (chunk, first, last),
+                                         lambda: format_chunk(chunk, first, last))
+                linked_markdown_lines.extend(formatted)
+                first = not formatted
+                continue
+            # 之后的每块都以 # 行开头，一定有输出
+            url = urls[url_index] if url_index < len(urls) else None
+            section, row = self._cached(self._sections, limit, (chunk, first, last, url, url_index, len(urls)),
+                                        lambda: self._link_section(chunk, first, last, url, url_index, len(urls),
+                                                                   limit))
+            linked_markdown_lines.extend(section)
+            if row is not None:
+                table_rows.append(row)
+                url_index += 1
+            first = False
+
+        return summary(table_rows) + "\n".join(linked_markdown_lines).strip()
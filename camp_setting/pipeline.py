@@ -0,0 +1,209 @@
+"""批量创建阶段与任务的完整流程，Streamlit 页面与命令行共用"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from camp_setting.files import release_file
+from camp_setting.heywhale import create_stage, create_task_and_upload_file, list_stages
+from camp_setting.journal import RunJournal
+from camp_setting.scheduler import DependencyScheduler, SkippedError
+from camp_setting.stages import DEFAULT_MAX_WORKERS
+from camp_setting.tracing import stage_scope, submit_in_context
+
+# 多个比赛 ID 之间的分隔符：空白、英文或中文逗号
+COMPETITION_ID_SEPARATORS = re.compile(r'[\s,，]+')
+
+
+def parse_competition_ids(text):
+    '''
+    把输入框中的比赛 ID 拆成列表：去掉空项（首尾或连续的分隔符）与重复项，保持输入顺序。
+        >>> parse_competition_ids("abc, def,")
+        ['abc', 'def']
+    '''
+    return [c for c in dict.fromkeys(COMPETITION_ID_SEPARATORS.split(text or "")) if c]
+
+
+class CampRun:
+    '''
+    一个比赛的批量创建：prepare() 写入运行记录并与服务端核对，add_to() 把每个关卡的链路加入调度器，
+    rows() 汇总结果。单个比赛见 run_camp，多个比赛共用一个调度器见 run_camps。
+    '''
+
+    def __init__(self, api, competition_id, plan, start_datetime, end_datetime, submission_notice,
+                 review_daily_limit, answer_files, sample_files=None, resume=True, journal=None, on_event=None):
+        if len(answer_files) != len(plan):
+            raise ValueError("The number of answer files must match the number of stages.")
+        if sample_files and len(sample_files) != len(plan):
+            raise ValueError("The number of sample files must match the number of stages.")
+        self.api = api
+        self.competition_id = competition_id
+        self.plan = plan
+        self.start_datetime = start_datetime
+        self.end_datetime = end_datetime
+        self.submission_notice = submission_notice
+        self.review_daily_limit = review_daily_limit
+        self.answer_files = answer_files
+        self.sample_files = sample_files
+        self.resume = resume
+        self.journal = journal or RunJournal.for_competition(competition_id)
+        self.on_event = on_event
+        self.existing_stages = set()
+
+    def emit(self, **event):
+        if self.on_event is not None:
+            self.on_event(event)
+
+    def prepare(self):
+        self.journal.start_run(resume=self.resume, stages=[name for name, _ in self.plan])
+        if self.resume:
+            try:
+                remote_stages, complete = list_stages(self.api, self.competition_id)
+                self.journal.reconcile(remote_stages, complete=complete)
+            except Exception as e:
+                self.emit(step="reconcile", index=None, stage=None, award=None, result=None, error=e, reused=False)
+        self.existing_stages = {name for name, _ in self.plan if self.journal.stage(name).stage_id}
+
+    def create_one(self, stage_name, award):
+        stage_journal = self.journal.stage(stage_name)
+        if stage_journal.stage_id:
+            return stage_journal.stage_id
+        response = create_stage(self.api, stage_name, self.start_datetime, self.end_datetime, award,
+                                self.competition_id)
+        if response.status_code != 200:
+            raise Exception(f"Status code: {response.status_code}. Response: {response.text}")
+        stage_id = response.json()['document']['_id']
+        stage_journal.record('stage_created', stage_id=stage_id)
+        return stage_id
+
+    def create_task(self, i, task_name, stage_id):
+        result = create_task_and_upload_file(
+            self.api,
+            task_name,
+            self.start_datetime,
+            self.end_datetime,
+            stage_id,
+            self.submission_notice,
+            int(self.review_daily_limit),
+            self.answer_files[i],
+            self.sample_files[i] if self.sample_files else None,
+            journal=self.journal.stage(task_name)
+        )
+        if isinstance(result, tuple) and "error" in result[0]:
+            raise Exception(f"{result[0]['error']}, Details: {result[0]['details']}")
+        elif "error" in result:
+            raise Exception(f"{result['error']}, Details: {result['details']}")
+        return result
+
+    @staticmethod
+    def traced(stage_name, fn, *args):
+        # 本关卡链路上发出的请求都记在该关卡名下
+        with stage_scope(stage_name):
+            return fn(*args)
+
+    def add_to(self, scheduler, prefix=()):
+        """节点 key 为 prefix + ("stage" | "task", i)"""
+        for i, (stage_name, award) in enumerate(self.plan):
+            scheduler.add(prefix + ("stage", i),
+                          lambda name=stage_name, award=award: self.traced(name, self.create_one, name, award),
+                          fatal=True)
+            scheduler.add(prefix + ("task", i),
+                          lambda stage_id, i=i, name=stage_name: self.traced(name, self.create_task, i, name, stage_id),
+                          deps=[prefix + ("stage", i)])
+
+    def on_done(self, step, i, result, error):
+        stage_name, award = self.plan[i]
+        if step == "stage":
+            reused = stage_name in self.existing_stages
+        else:
+            reused = bool(result and result.get('skipped'))
+            # 任务结束（成功、失败或跳过）后不再需要该关卡的文件，转存的临时副本可以删除
+            release_file(self.answer_files[i])
+            if self.sample_files:
+                release_file(self.sample_files[i])
+        self.emit(step=step, index=i, stage=stage_name, award=award, result=result, error=error, reused=reused)
+
+    def rows(self, results, errors, prefix=()):
+        rows = []
+        for i, (stage_name, award) in enumerate(self.plan):
+            task = results.get(prefix + ("task", i)) or {}
+            error = errors.get(prefix + ("stage", i)) or errors.get(prefix + ("task", i))
+            if error is None:
+                status = "skipped" if task.get('skipped') else "created"
+            elif isinstance(error, SkippedError):
+                status = "not_started"
+            else:
+                status = "failed"
+            rows.append({
+                "stage": stage_name,
+                "award": award,
+                "status": status,
+                "stage_id": results.get(prefix + ("stage", i)),
+                "task_id": task.get('id'),
+                "answer_file_name": self.answer_files[i].name,
+                "sample_file_name": self.sample_files[i].name if self.sample_files else "",
+                "error": str(error) if error is not None else None,
+            })
+        return rows
+
+
+def run_camp(api, competition_id, plan, start_datetime, end_datetime, submission_notice, review_daily_limit,
+             answer_files, sample_files=None, max_workers=DEFAULT_MAX_WORKERS, resume=True, journal=None,
+             on_event=None):
+    '''
+    按 plan（[(stage_name, award), ...]，见 build_stage_plan）创建阶段与任务。
+    answer_files / sample_files 需已排好序，第 i 个文件对应 plan[i]；
+    可以是 FileSpool 转存的副本，每个关卡的任务结束后即释放对应文件。
+
+    每个关卡一条链路：创建阶段 -> 创建任务并上传文件，阶段 ID 一出来就开始创建任务。
+    进度写入本地操作日志，resume=True 时先与比赛已有的阶段核对，跳过已完成的步骤。
+
+    on_event(event) 在调用线程中回调，event 为字典：
+        {"step": "reconcile" | "stage" | "task", "index", "stage", "award", "result", "error", "reused"}
+    返回每个关卡一行的结果列表。
+    '''
+    camp = CampRun(api, competition_id, plan, start_datetime, end_datetime, submission_notice, review_daily_limit,
+                   answer_files, sample_files, resume=resume, journal=journal, on_event=on_event)
+    camp.prepare()
+    scheduler = DependencyScheduler(max_workers=max_workers)
+    camp.add_to(scheduler)
+    results, errors = scheduler.run(on_done=lambda key, result, error: camp.on_done(*key, result, error))
+    return camp.rows(results, errors)
+
+
+def run_camps(api, competition_ids, plan, start_datetime, end_datetime, submission_notice, review_daily_limit,
+              answer_files, sample_files=None, max_workers=DEFAULT_MAX_WORKERS, resume=True, on_event=None):
+    '''
+    把同一套关卡模板（plan 与答案/示例文件）同时创建到多个比赛。
+    所有比赛的链路放进同一个调度器：同时执行的步骤总数不超过 max_workers，
+    空出的名额优先给在途步骤最少的比赛，各比赛交替推进。
+    某个比赛的阶段创建失败只停止该比赛，其他比赛继续。
+
+    on_event 的 event 比 run_camp 多一个 "competition_id" 字段；返回所有比赛的结果行，每行带 "competition_id"。
+    '''
+    competition_ids = list(dict.fromkeys(competition_ids))
+    camps = {}
+    for competition_id in competition_ids:
+        def emit(event, competition_id=competition_id):
+            if on_event is not None:
+                on_event({**event, "competition_id": competition_id})
+        camps[competition_id] = CampRun(api, competition_id, plan, start_datetime, end_datetime, submission_notice,
+                                        review_daily_limit, answer_files, sample_files, resume=resume, on_event=emit)
+
+    # 各比赛的日志核对（列出已有阶段）并发进行
+    with ThreadPoolExecutor(max_workers=max(1, min(int(max_workers), len(camps)))) as executor:
+        for future in [submit_in_context(executor, camp.prepare) for camp in camps.values()]:
+            future.result()
+
+    scheduler = DependencyScheduler(max_workers=max_workers, group=lambda key: key[0])
+    for competition_id, camp in camps.items():
+        camp.add_to(scheduler, prefix=(competition_id,))
+
+    def on_done(key, result, error):
+        competition_id, step, i = key
+        camps[competition_id].on_done(step, i, result, error)
+
+    results, errors = scheduler.run(on_done=on_done)
+    rows = []
+    for competition_id, camp in camps.items():
+        rows.extend({"competition_id": competition_id, **row}
+                    for row in camp.rows(results, errors, prefix=(competition_id,)))
+    return rows
@@ -0,0 +1,227 @@
+'''
+批量创建前的预检：在发出第一个请求之前检查全部输入，任何一项不通过都不开始运行。
+
+    report = preflight(cookie_string, competition_ids, start_datetime, end_datetime,
+                       start_stage, end_stage, answer_files, sample_files)
+    if not report.ok:
+        ...  # report.problems 为设置项的问题，report.files 为每个文件一行的检查结果
+
+- 答案/示例 CSV 并行完整解析一遍：能否解析、是否为空、是否包含 id 列、列名是否重复，
+  示例文件须包含同一关卡答案文件的第一列（主键列）
+- 开始/结束时间须为 "YYYY-MM-DDTHH:MM:SS.000Z" 且结束晚于开始
+- 每个比赛 ID 非空且只含字母、数字、- 与 _
+- Cookie 能解析且包含登录会话字段
+- 关卡计划（关卡名与奖励）在内存中生成，文件数与关卡数一致
+'''
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from camp_setting.heywhale import parse_cookie_string
+from camp_setting.stages import build_stage_plan, DEFAULT_MAX_WORKERS
+
+# 接口要求的时间格式（UTC），与页面默认值一致
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.000Z"
+# 每个 CSV 都必须包含的列
+REQUIRED_COLUMNS = ('id',)
+# 比赛 ID 只由字母、数字、- 与 _ 组成（线上为 24 位十六进制）
+COMPETITION_ID_PATTERN = re.compile(r'^[0-9A-Za-z_-]+$')
+# 缺少这些 Cookie 时接口会要求重新登录
+REQUIRED_COOKIES = ('heywhale.sid.v2', 'heywhale.sid.v2.sig')
+
+
+class PreflightReport:
+    """预检结果：plan 为关卡计划，cookie_str 为规范化后的 Cookie；problems 或任一文件有错误时 ok 为 False"""
+
+    def __init__(self):
+        self.plan = []
+        self.cookie_str = ""
+        self.problems = []
+        self.files = []
+
+    @property
+    def ok(self):
+        return not self.problems and not any(row['error'] for row in self.files)
+
+    def errors(self):
+        """所有问题的文字说明，设置项在前，文件按关卡顺序"""
+        return self.problems + [f"{row['kind']} {row['file']}: {row['error']}" for row in self.files if row['error']]
+
+
+def _csv_libraries():
+    '''
+    pandas / pyarrow 只在真正解析 CSV 时导入，导入批量页面与命令行时不承担这部分开销。
+    pyarrow 可选：没有时退回 pandas 分块解析（明显更慢，且解析时不释放 GIL），此时 pa / pa_csv 为 None。
+    '''
+    import pandas as pd
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        pa = pa_csv = None
+    return pd, pa, pa_csv
+
+
+def _csv_source(file):
+    # 磁盘文件直接按路径读取；内存中的上传文件从头读取
+    path = getattr(file, 'path', None)
+    if path is not None:
+        return path
+    file.seek(0)
+    return file
+
+
+def _count_rows(file, columns):
+    """逐块解析全部数据行并计数：列数不一致、引号未闭合、非 UTF-8 都会抛出异常"""
+    from camp_setting.answers import ARROW_BLOCK_SIZE, CHUNK_ROWS
+
+    pd, pa, pa_csv = _csv_libraries()
+    if pa_csv is not None:
+        # 全部按字符串列读取，同时校验 UTF-8；解析在 Arrow 线程中进行，不占用 GIL
+        reader = pa_csv.open_csv(
+            _csv_source(file),
+            read_options=pa_csv.ReadOptions(block_size=ARROW_BLOCK_SIZE),
+            convert_options=pa_csv.ConvertOptions(column_types={column: pa.string() for column in columns}),
+        )
+        return sum(batch.num_rows for batch in reader)
+    rows = 0
+    with pd.read_csv(_csv_source(file), chunksize=CHUNK_ROWS) as reader:
+        for chunk in reader:
+            rows += len(chunk)
+    return rows
+
+
+def check_csv(file, required_columns=REQUIRED_COLUMNS):
+    '''
+    完整解析一个 CSV（按块读取，有 pyarrow 时走 Arrow），返回 {file, size, rows, columns, error}。
+    不修改文件内容；内存中的文件读完后把指针放回开头。
+    '''
+    pd, _, _ = _csv_libraries()
+    row = {"file": file.name, "size": getattr(file, 'size', None), "rows": None, "columns": None, "error": None}
+    if row["size"] == 0:
+        row["error"] = "文件为空"
+        return row
+    try:
+        # 原始表头（不做重名处理），用于检查必需列与重复列名
+        columns = [str(c) for c in pd.read_csv(_csv_source(file), header=None, nrows=1, dtype=str).iloc[0].tolist()]
+        rows = _count_rows(file, columns)
+    except pd.errors.EmptyDataError:
+        row["error"] = "文件为空"
+        return row
+    except Exception as e:
+        row["error"] = f"无法解析为 CSV：{e}"
+        return row
+    finally:
+        if hasattr(file, 'seek'):
+            file.seek(0)
+
+    row["rows"] = rows
+    row["columns"] = columns
+    missing = [c for c in required_columns if c not in columns]
+    duplicated = sorted({c for c in columns if columns.count(c) > 1})
+    if missing:
+        row["error"] = f"缺少必需的列：{', '.join(missing)}"
+    elif duplicated:
+        row["error"] = f"列名重复：{', '.join(duplicated)}"
+    elif rows == 0:
+        row["error"] = "只有表头，没有数据行"
+    return row
+
+
+def check_datetime(label, value):
+    """解析接口时间字符串，返回 (datetime, 问题说明)，二者有一个为 None"""
+    try:
+        return datetime.strptime((value or "").strip(), DATETIME_FORMAT), None
+    except ValueError:
+        return None, f"{label} 格式应为 YYYY-MM-DDTHH:MM:SS.000Z，实际为 {value!r}"
+
+
+def check_competition_ids(competition_ids):
+    """每个为空或格式不正确的比赛 ID 一条问题说明"""
+    if not competition_ids:
+        return ["Competition ID 为空"]
+    problems = []
+    for i, competition_id in enumerate(competition_ids, 1):
+        value = (competition_id or "").strip()
+        if not value:
+            problems.append(f"第 {i} 个 Competition ID 为空")
+        elif not COMPETITION_ID_PATTERN.match(value):
+            problems.append(f"第 {i} 个 Competition ID 格式不正确：{competition_id!r}")
+    return problems
+
+
+def check_cookie(cookie_string):
+    """返回 (规范化后的 Cookie 字符串, 问题说明)"""
+    try:
+        cookies = parse_cookie_string(cookie_string or "")
+    except ValueError:
+        return "", "Cookie 格式不正确，应为 key=value; key=value 的形式"
+    if not cookies:
+        return "", "Cookie 为空"
+    missing = [key for key in REQUIRED_COOKIES if not cookies.get(key)]
+    if missing:
+        return "", f"Cookie 缺少登录字段：{', '.join(missing)}"
+    return "; ".join(f"{key}={value}" for key, value in cookies.items()), None
+
+
+def check_files(answer_files, sample_files=None, plan=None, max_workers=DEFAULT_MAX_WORKERS):
+    '''
+    并行检查全部文件，返回每个文件一行：{kind, stage, file, size, rows, columns, error}，答案文件在前。
+    answer_files / sample_files 需已排好序，第 i 个文件对应 plan[i]。
+    '''
+    sample_files = sample_files or []
+    files = [("answer", i, f) for i, f in enumerate(answer_files)] + [("sample", i, f) for i, f in enumerate(sample_files)]
+    if not files:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(int(max_workers), len(files)))) as executor:
+        checked = list(executor.map(lambda item: check_csv(item[2]), files))
+
+    rows = []
+    for (kind, i, _), row in zip(files, checked):
+        stage = plan[i][0] if plan is not None and i < len(plan) else None
+        rows.append({"kind": kind, "stage": stage, **row})
+
+    # 示例文件须包含同一关卡答案文件的主键列
+    answers = rows[:len(answer_files)]
+    for answer, sample in zip(answers, rows[len(answer_files):]):
+        if answer['error'] or sample['error'] or not answer['columns']:
+            continue
+        key = answer['columns'][0]
+        if key not in sample['columns']:
+            sample['error'] = f"表头与答案文件 {answer['file']} 不一致：缺少主键列 {key}"
+    return rows
+
+
+def preflight(cookie_string, competition_ids, start_datetime, end_datetime, start_stage, end_stage,
+              answer_files, sample_files=None, awards=None, max_workers=DEFAULT_MAX_WORKERS):
+    """检查一次批量创建的全部输入，不发出任何网络请求，返回 PreflightReport"""
+    report = PreflightReport()
+
+    report.problems.extend(check_competition_ids(competition_ids))
+    report.cookie_str, problem = check_cookie(cookie_string)
+    if problem:
+        report.problems.append(problem)
+
+    start, problem = check_datetime("Start Datetime", start_datetime)
+    if problem:
+        report.problems.append(problem)
+    end, problem = check_datetime("End Datetime", end_datetime)
+    if problem:
+        report.problems.append(problem)
+    if start is not None and end is not None and end <= start:
+        report.problems.append("End Datetime 必须晚于 Start Datetime")
+
+    try:
+        report.plan = build_stage_plan(start_stage, end_stage, awards)
+    except ValueError as e:
+        report.problems.append(f"关卡设置不正确：{e}")
+    else:
+        if not report.plan:
+            report.problems.append("没有需要创建的关卡，请检查起止关卡编号")
+        elif len(answer_files) != len(report.plan):
+            report.problems.append(f"答案文件数（{len(answer_files)}）与关卡数（{len(report.plan)}）不一致")
+        elif sample_files and len(sample_files) != len(report.plan):
+            report.problems.append(f"示例文件数（{len(sample_files)}）与关卡数（{len(report.plan)}）不一致")
+
+    report.files = check_files(answer_files, sample_files, report.plan, max_workers=max_workers)
+    return report
@@ -0,0 +1,217 @@
+'''
+页面执行剖析：按需打开，记录每次页面执行的耗时分布，供 set_camp.py 在侧边栏展示与下载。
+
+    with profiled("页面名") as profile:
+        exec(page_code, ...)
+    profile.top()                # 耗时最多的函数
+    profile.pstats_bytes()       # 可用 pstats / snakeviz 打开
+    profile.speedscope_json()    # 可拖进 https://www.speedscope.app 查看火焰图
+
+同时运行两种剖析：
+- cProfile（确定性）：每个函数的调用次数、自身耗时与累计耗时，pandas 解析、正则等都按函数计入
+- 栈采样：后台线程每隔 SAMPLE_INTERVAL 秒记录一次页面线程的调用栈，生成火焰图；
+  网络等待、锁等待等不在 Python 函数里消耗 CPU 的时间也会体现在栈上
+Python 3.12 起 cProfile 同一时间只能有一个在运行，多个会话同时剖析时后来者只做栈采样。
+'''
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+from camp_setting.singleton import process_singleton
+
+# 设为 1 时所有页面执行都做剖析；也可在地址栏加 ?profile=1 只对当前会话打开
+PROFILE_ENV = 'CAMP_PROFILE'
+# 每个页面保留的剖析结果数
+KEEP_PROFILES = 10
+# 栈采样间隔（秒）
+SAMPLE_INTERVAL = 0.005
+# 侧边栏展示的函数数
+TOP_FUNCTIONS = 15
+
+
+def profiling_enabled(query_value=None):
+    """环境变量 CAMP_PROFILE 或查询参数 profile 为真值时打开"""
+    for value in (os.environ.get(PROFILE_ENV), query_value):
+        if value is not None and str(value).strip().lower() in ("1", "true", "yes", "on"):
+            return True
+    return False
+
+
+def _frame_key(code):
+    return (code.co_name, code.co_filename, code.co_firstlineno)
+
+
+class StackSampler:
+    """在后台线程中定时记录目标线程的调用栈（从 root_frame 之下到当前执行的函数）"""
+
+    def __init__(self, thread_id, root_frame, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.root_frame = root_frame
+        self.interval = interval
+        # [(调用栈（根在前）, 距上一次采样的秒数), ...]
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='camp-profile-sampler', daemon=True)
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            stack = []
+            while frame is not None and frame is not self.root_frame:
+                stack.append(_frame_key(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.samples.append((tuple(reversed(stack)), now - last))
+            last = now
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class PageProfile:
+    """一次页面执行的剖析结果"""
+
+    def __init__(self, page, started_at, wall_seconds, stats, samples):
+        self.page = page
+        self.started_at = started_at
+        self.wall_seconds = wall_seconds
+        # pstats.Stats；cProfile 被占用时为 None
+        self.stats = stats
+        self.samples = samples
+
+    def top(self, n=TOP_FUNCTIONS, sort='cumulative'):
+        '''
+        耗时最多的 n 个函数：[{function, calls, self_ms, total_ms}, ...]，sort 为 "cumulative" 或 "self"。
+        没有 cProfile 结果时按采样估算（calls 为采样数）。
+        '''
+        rows = []
+        if self.stats is not None:
+            for (filename, line, name), (_, calls, tottime, cumtime, _) in self.stats.stats.items():
+                rows.append({"function": _describe(name, filename, line), "calls": calls,
+                             "self_ms": tottime * 1000, "total_ms": cumtime * 1000})
+        else:
+            totals = {}
+            for stack, weight in self.samples:
+                for frame in set(stack):
+                    row = totals.setdefault(frame, {"function": _describe(*frame), "calls": 0,
+                                                    "self_ms": 0.0, "total_ms": 0.0})
+                    row["calls"] += 1
+                    row["total_ms"] += weight * 1000
+                totals[stack[-1]]["self_ms"] += weight * 1000
+            rows = list(totals.values())
+        key = "self_ms" if sort == "self" else "total_ms"
+        rows.sort(key=lambda row: row[key], reverse=True)
+        return [{**row, "self_ms": round(row["self_ms"], 1), "total_ms": round(row["total_ms"], 1)}
+                for row in rows[:n]]
+
+    def pstats_bytes(self):
+        """与 pstats.Stats.dump_stats 写出的文件内容相同；没有 cProfile 结果时为 None"""
+        if self.stats is None:
+            return None
+        return marshal.dumps(self.stats.stats)
+
+    def speedscope_json(self):
+        """栈采样结果，speedscope 的 sampled 格式"""
+        frames = OrderedDict()
+        samples = []
+        weights = []
+        for stack, weight in self.samples:
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(weight)
+        document = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [{"name": name, "file": filename, "line": line}
+                                  for name, filename, line in frames]},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.page,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": f"{self.page} @ {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at))}",
+            "exporter": "camp_setting.profiling",
+        }
+        return json.dumps(document, ensure_ascii=False)
+
+
+def _describe(name, filename, line):
+    if filename == '~':
+        # 内置函数，name 形如 "<method 'read' of ...>"
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+class ProfileStore:
+    """每个页面保留最近 keep 次的剖析结果，进程内共用，见 get_profile_store()"""
+
+    def __init__(self, keep=KEEP_PROFILES):
+        self.keep = keep
+        self._profiles = {}
+        self._lock = threading.Lock()
+
+    def add(self, profile):
+        with self._lock:
+            self._profiles.setdefault(profile.page, deque(maxlen=self.keep)).append(profile)
+
+    def profiles(self, page):
+        """该页面的剖析结果，最新的在前"""
+        with self._lock:
+            return list(reversed(self._profiles.get(page, ())))
+
+
+@process_singleton
+def get_profile_store():
+    """返回进程级共享的 ProfileStore"""
+    return ProfileStore()
+
+
+class profiled:
+    '''
+    剖析 with 块内的执行，结束时（包括抛出异常，如 st.rerun()）把结果存入 store。
+    调用栈只记录 with 语句所在函数之下的部分。
+    '''
+
+    def __init__(self, page, store=None, interval=SAMPLE_INTERVAL):
+        self.page = page
+        self.store = store or get_profile_store()
+        self.interval = interval
+        self.profile = None
+
+    def __enter__(self):
+        self._profiler = cProfile.Profile()
+        try:
+            self._profiler.enable()
+        except ValueError:
+            # 其他会话正在使用 cProfile（Python 3.12+），只做栈采样
+            self._profiler = None
+        self._sampler = StackSampler(threading.get_ident(), sys._getframe(1), self.interval)
+        self._sampler.start()
+        self._started_at = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self._started
+        if self._profiler is not None:
+            self._profiler.disable()
+        self._sampler.stop()
+        stats = pstats.Stats(self._profiler, stream=io.StringIO()) if self._profiler is not None else None
+        self.profile = PageProfile(self.page, self._started_at, wall, stats, self._sampler.samples)
+        self.store.add(self.profile)
+        return False
@@ -0,0 +1,233 @@
+"""七牛云上传：小文件表单上传，大文件分片上传（v2），均直接读取上传文件的内存视图，不额外复制"""
+import base64
+import hashlib
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests_toolbelt import MultipartEncoder
+
+from camp_setting.client import get_client
+from camp_setting.ratelimit import retry_after_seconds, wait_before_retry
+from camp_setting.tracing import submit_in_context
+from camp_setting.uptoken import token_bucket
+
+QINIU_UP_URL = os.environ.get('QINIU_UP_URL', 'https://up.qbox.me/')
+
+# 不小于该大小的文件使用分片上传
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+# 分片大小，七牛要求 1MB ~ 1GB
+PART_SIZE = 4 * 1024 * 1024
+# 七牛 etag 的分块大小，固定为 4MB
+ETAG_BLOCK_SIZE = 4 * 1024 * 1024
+# 单个文件同时上传的分片数
+PART_WORKERS = 4
+# 可重试错误下，每个请求（分片上传为每轮未完成的分片）在 HttpClient 之外的最大尝试次数；
+# 总的重试时长与 HttpClient 内部的重试共用 client.retry_budget
+MAX_ATTEMPTS = 3
+
+
+class BufferReader:
+    """把 memoryview 包装成只读文件对象，供 MultipartEncoder 流式读取"""
+
+    def __init__(self, view):
+        self.view = view
+        self.pos = 0
+
+    def __len__(self):
+        # MultipartEncoder 以 len() 作为剩余可读字节数
+        return len(self.view) - self.pos
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=0):
+        if whence == 0:
+            self.pos = offset
+        elif whence == 1:
+            self.pos += offset
+        else:
+            self.pos = len(self.view) + offset
+        return self.pos
+
+    def read(self, size=-1):
+        end = len(self.view) if size is None or size < 0 else min(len(self.view), self.pos + size)
+        data = self.view[self.pos:end].tobytes()
+        self.pos = end
+        return data
+
+
+def file_buffer(file):
+    """返回上传文件内容的 memoryview；UploadedFile（BytesIO）与 MappedFile（内存映射）都用 getbuffer() 避免复制"""
+    if hasattr(file, 'getbuffer'):
+        return file.getbuffer()
+    return memoryview(file.getvalue())
+
+
+def file_size(file):
+    """上传文件的字节数"""
+    size = getattr(file, 'size', None)
+    if size is None:
+        with file_buffer(file) as view:
+            size = len(view)
+    return size
+
+
+def qiniu_etag(view):
+    '''
+    按七牛 etag 算法计算内容哈希（与上传返回的 hash 字段一致）：
+    按 4MB 分块做 SHA-1，只有一块时为 0x16 + SHA-1，否则为 0x96 + SHA-1(各块 SHA-1 拼接)，再做 URL 安全的 base64。
+    直接对 memoryview 切片求哈希，不复制文件内容。
+    '''
+    digests = []
+    for start in range(0, max(len(view), 1), ETAG_BLOCK_SIZE):
+        with view[start:start + ETAG_BLOCK_SIZE] as block:
+            digests.append(hashlib.sha1(block).digest())
+    if len(digests) == 1:
+        data = b'\x16' + digests[0]
+    else:
+        data = b'\x96' + hashlib.sha1(b''.join(digests)).digest()
+    return base64.urlsafe_b64encode(data).decode('ascii')
+
+
+def file_etag(file):
+    """上传文件内容的七牛 etag"""
+    with file_buffer(file) as view:
+        return qiniu_etag(view)
+
+
+def is_transient(error):
+    """网络错误、超时、429 与 5xx 可以重试"""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return False
+
+
+def retry_or_raise(error, attempt, max_attempts, deadline):
+    """第 attempt 次（从 0 开始）尝试失败后：可重试且未超出次数与预算时退避等待，否则抛出 error"""
+    response = getattr(error, 'response', None)
+    if (not is_transient(error) or attempt + 1 >= max_attempts
+            or not wait_before_retry(attempt, deadline, retry_after_seconds(response))):
+        raise error
+
+
+def with_retries(send, client, max_attempts=MAX_ATTEMPTS):
+    '''
+    调用 send(deadline) 并返回其结果；遇到可重试错误时退避（full jitter）后重试，最多 max_attempts 次。
+    send 把 deadline 传给 HttpClient，HttpClient 内部的重试与这里的重试共用 client.retry_budget 秒的预算。
+    '''
+    deadline = time.monotonic() + client.retry_budget
+    for attempt in range(max_attempts):
+        try:
+            return send(deadline)
+        except requests.RequestException as e:
+            retry_or_raise(e, attempt, max_attempts, deadline)
+
+
+def form_upload(token, key, name, view, client, max_attempts=MAX_ATTEMPTS):
+    '''
+    单次表单上传。表单流（MultipartEncoder）只能读一次，HttpClient 不会重发，
+    因此在这里重试可重试错误，每次重新构造表单。
+    '''
+    def send(deadline):
+        multipart_data = MultipartEncoder(
+            fields={
+                'token': token,
+                'key': key,
+                'file': (name, BufferReader(view), 'application/octet-stream')
+            },
+            boundary = uuid.uuid4().hex
+        )
+        response = client.post(
+            QINIU_UP_URL,
+            data=multipart_data,
+            headers={'Content-Type': multipart_data.content_type},
+            deadline=deadline,
+        )
+        response.raise_for_status()  # 如果请求失败，抛出异常
+        return response.json()
+
+    return with_retries(send, client, max_attempts)
+
+
+def resumable_upload(token, key, name, view, client, part_size=PART_SIZE, max_workers=PART_WORKERS,
+                     max_attempts=MAX_ATTEMPTS):
+    '''
+    分片上传 v2：初始化 -> 并行上传分片 -> 合并。
+    分片直接以 memoryview 切片作为请求体发送；遇到可重试错误时只重传尚未成功的分片。
+    初始化与合并（POST，HttpClient 不会重试网络错误与 5xx）在这里重试：
+    重复初始化只会多出一个无用的 uploadId，用同一 uploadId 重复合并是安全的。
+    '''
+    bucket = token_bucket(token)
+    if not bucket:
+        raise ValueError("Cannot read bucket from upload token")
+    encoded_key = base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii')
+    base_url = f"{QINIU_UP_URL.rstrip('/')}/buckets/{bucket}/objects/{encoded_key}/uploads"
+    auth = {'Authorization': f'UpToken {token}'}
+
+    def init(deadline):
+        response = client.post(base_url, headers=auth, deadline=deadline)
+        response.raise_for_status()
+        return response.json()['uploadId']
+
+    upload_id = with_retries(init, client, max_attempts)
+
+    part_count = max(1, -(-len(view) // part_size))
+    etags = {}
+    # 每个分片一个重试预算，首次上传时开始计时，HttpClient 内部的重试与下面按轮次的重传共用
+    deadlines = {}
+
+    def upload_part(part_number):
+        deadline = deadlines.setdefault(part_number, time.monotonic() + client.retry_budget)
+        start = (part_number - 1) * part_size
+        with view[start:start + part_size] as part:
+            headers = {
+                **auth,
+                'Content-Type': 'application/octet-stream',
+                'Content-MD5': hashlib.md5(part).hexdigest(),
+            }
+            response = client.put(f"{base_url}/{upload_id}/{part_number}", data=part, headers=headers,
+                                  deadline=deadline)
+            response.raise_for_status()
+            etags[part_number] = response.json()['etag']
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        for attempt in range(max_attempts):
+            missing = [n for n in range(1, part_count + 1) if n not in etags]
+            if not missing:
+                break
+            futures = [submit_in_context(executor, upload_part, n) for n in missing]
+            errors = [f.exception() for f in futures if f.exception() is not None]
+            if not errors:
+                break
+            fatal = [e for e in errors if not is_transient(e)]
+            # 按剩余预算最少的分片决定是否还能再传一轮
+            retry_or_raise((fatal or errors)[0], attempt, max_attempts,
+                           min(deadlines[n] for n in missing if n not in etags))
+
+    complete_body = {
+        "parts": [{"partNumber": n, "etag": etags[n]} for n in range(1, part_count + 1)],
+        "fname": name,
+        "mimeType": 'application/octet-stream',
+    }
+
+    def complete(deadline):
+        response = client.post(f"{base_url}/{upload_id}", headers=auth, json=complete_body, deadline=deadline)
+        response.raise_for_status()
+        return response.json()
+
+    return with_retries(complete, client, max_attempts)
+
+
+# 上传文件到七牛云
+def upload_file_to_qiniu(token, key, file, client=None):
+    """上传文件到七牛云，大文件自动使用分片上传"""
+    client = client or get_client()
+    with file_buffer(file) as view:
+        if len(view) >= MULTIPART_THRESHOLD:
+            return resumable_upload(token, key, file.name, view, client)
+        return form_upload(token, key, file.name, view, client)
@@ -0,0 +1,99 @@
+"""客户端限速：令牌桶限制请求速率上限，AIMD 调整并发窗口；遇到 429/503 减半，成功后逐步恢复"""
+import random
+import threading
+import time
+
+# 每个 host 的默认参数
+DEFAULT_RATE = 20.0          # 每秒请求数上限
+DEFAULT_BURST = 10
+DEFAULT_CONCURRENCY = 8      # 初始并发窗口
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 32
+
+# 重试：指数退避 + 全抖动，总时长不超过 RETRY_BUDGET 秒
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 10.0
+RETRY_BUDGET = 60.0
+THROTTLE_STATUSES = (429, 503)
+
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    """第 attempt 次重试前的等待时间（full jitter）"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def wait_before_retry(attempt, deadline, retry_after=None):
+    """等待第 attempt 次重试前的退避时间（不短于 Retry-After）；等待后会超过 deadline（time.monotonic()）时不等待，返回 False"""
+    delay = max(backoff_delay(attempt), retry_after or 0)
+    if time.monotonic() + delay > deadline:
+        return False
+    time.sleep(delay)
+    return True
+
+
+def retry_after_seconds(response):
+    """解析 Retry-After 头（秒数形式），没有或无法解析时返回 None"""
+    value = response.headers.get('Retry-After') if response is not None else None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class RateGovernor:
+    '''
+    一个 host 一个实例：
+    - acquire() 阻塞直到并发窗口有空位且令牌桶有令牌
+    - release(throttled, retry_after) 归还并发名额：被限流时并发窗口减半（乘性减），
+      并在 Retry-After 指定的时间内暂停发送；窗口被占满时每次成功 +1/窗口，
+      即每轮约 +1（加性增），窗口没用满时不增长
+    '''
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, concurrency=DEFAULT_CONCURRENCY,
+                 min_concurrency=MIN_CONCURRENCY, max_concurrency=MAX_CONCURRENCY, clock=time.monotonic):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.limit = float(concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.clock = clock
+        self.tokens = float(burst)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.throttled_count = 0
+        self._updated = clock()
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                now = self.clock()
+                self._refill(now)
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.in_flight >= max(self.min_concurrency, int(self.limit)):
+                    wait = None  # 等待 release 通知
+                elif self.tokens < 1:
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    return
+                self._cond.wait(wait)
+
+    def release(self, throttled=False, retry_after=None):
+        with self._cond:
+            window_full = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            if throttled:
+                self.throttled_count += 1
+                self.limit = max(self.min_concurrency, self.limit / 2)
+                if retry_after:
+                    self.paused_until = max(self.paused_until, self.clock() + retry_after)
+            elif window_full:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._cond.notify_all()
@@ -0,0 +1,128 @@
+"""简单的依赖调度器：节点在其依赖全部完成后立即提交到共享线程池"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from camp_setting.stages import DEFAULT_MAX_WORKERS
+from camp_setting.tracing import submit_in_context
+
+
+class SkippedError(Exception):
+    """依赖失败或调度已停止，节点没有执行"""
+
+
+class DependencyScheduler:
+    '''
+    用法:
+        scheduler = DependencyScheduler(max_workers=8)
+        scheduler.add(("stage", 1), create_stage_fn)
+        scheduler.add(("task", 1), create_task_fn, deps=[("stage", 1)])
+        results, errors = scheduler.run(on_done=callback)
+
+    - fn 以依赖节点的返回值（按 deps 顺序）作为位置参数调用
+    - 依赖失败的节点不会执行，记为 SkippedError
+    - fatal=True 的节点失败后不再启动新的链路（无依赖的节点），已开始的链路继续执行完
+    - 刚解锁的节点优先于尚未开始的节点，一条链路上的后续步骤尽快执行
+    - on_done(key, result, error) 在调用线程中按完成顺序回调，可以直接调用 st.*
+
+    传入 group(key) 时节点按组公平调度：空出的名额给在途节点最少的组（同组内仍按上面的顺序），
+    fatal 节点失败只停止本组新链路的启动。
+    '''
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, group=None):
+        self.max_workers = max(1, int(max_workers))
+        self.grouped = group is not None
+        self.group = group or (lambda key: None)
+        self._nodes = {}
+        self._order = []
+
+    def add(self, key, fn, deps=(), fatal=False):
+        if key in self._nodes:
+            raise ValueError(f"Duplicate node: {key}")
+        for dep in deps:
+            if dep not in self._nodes:
+                raise ValueError(f"Unknown dependency {dep} for node {key}")
+        self._nodes[key] = (fn, tuple(deps), fatal)
+        self._order.append(key)
+
+    def run(self, on_done=None):
+        """执行所有节点，返回 (results, errors) 两个以节点 key 为键的字典"""
+        results = {}
+        errors = {}
+        dependents = {key: [] for key in self._order}
+        waiting = {}
+        for key in self._order:
+            deps = self._nodes[key][1]
+            waiting[key] = len(deps)
+            for dep in deps:
+                dependents[dep].append(key)
+
+        ready = deque(key for key in self._order if waiting[key] == 0)
+        stopped = set()
+        running = {}
+
+        def next_ready():
+            """在途节点最少的组中最靠前的就绪节点；不分组时即队首"""
+            if not self.grouped:
+                return ready.popleft()
+            best = 0
+            best_running = None
+            for position, key in enumerate(ready):
+                count = running.get(self.group(key), 0)
+                if best_running is None or count < best_running:
+                    best, best_running = position, count
+                    if count == 0:
+                        break
+            key = ready[best]
+            del ready[best]
+            return key
+
+        def finish(key, result=None, error=None):
+            if error is None:
+                results[key] = result
+            else:
+                errors[key] = error
+            if on_done is not None:
+                on_done(key, result, error)
+            unlocked = []
+            for child in dependents[key]:
+                if error is not None:
+                    if child not in errors:
+                        finish(child, error=SkippedError(f"Dependency {key} failed: {error}"))
+                    continue
+                waiting[child] -= 1
+                if waiting[child] == 0 and child not in errors:
+                    unlocked.append(child)
+            # 新解锁的节点放到队首，保持链路优先
+            ready.extendleft(reversed(unlocked))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {}
+            while pending or ready:
+                while ready and len(pending) < self.max_workers:
+                    key = next_ready()
+                    fn, deps, _ = self._nodes[key]
+                    group = self.group(key)
+                    if group in stopped and not deps:
+                        continue
+                    args = [results[dep] for dep in deps]
+                    pending[submit_in_context(executor, fn, *args)] = key
+                    running[group] = running.get(group, 0) + 1
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    key = pending.pop(future)
+                    running[self.group(key)] -= 1
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        if self._nodes[key][2]:
+                            stopped.add(self.group(key))
+                        finish(key, error=e)
+                    else:
+                        finish(key, result=result)
+
+        for key in self._order:
+            if key not in results and key not in errors:
+                errors[key] = SkippedError("Not started because an earlier step failed")
+        return results, errors
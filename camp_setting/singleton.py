@@ -0,0 +1,24 @@
+"""进程级共享实例：模块只导入一次，Streamlit 重跑脚本时复用同一个实例"""
+import functools
+import threading
+
+
+def process_singleton(factory):
+    '''
+    把无参的工厂函数包装为返回进程级共享实例的函数，第一次调用时创建（多个会话同时调用也只创建一次）：
+        @process_singleton
+        def get_client():
+            return HttpClient()
+    '''
+    lock = threading.Lock()
+    instance = []
+
+    @functools.wraps(factory)
+    def get():
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+
+    return get
@@ -0,0 +1,99 @@
+"""阶段（关卡）创建：奖励规则与并发创建引擎"""
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from camp_setting.tracing import submit_in_context
+
+# 默认同时在途的 POST 请求数
+DEFAULT_MAX_WORKERS = 8
+
+
+class StageCreationError(Exception):
+    """某个阶段创建失败。results 中保留已成功创建的阶段（未完成的位置为 None）"""
+
+    def __init__(self, stage_name, cause, results):
+        super().__init__(f"Failed to create stage '{stage_name}': {cause}")
+        self.stage_name = stage_name
+        self.cause = cause
+        self.results = results
+
+
+def stage_award(i, end_stage):
+    """第 i 关的鲸币奖励：前两关 1，中间关 i-1，最后一关 6"""
+    if i <= 2:
+        return 1
+    elif i < end_stage:
+        return i - 1
+    elif i == end_stage:
+        return 6
+    else:
+        raise ValueError("Invalid stage number")
+
+
+def build_stage_plan(start_stage, end_stage, awards=None):
+    """生成 [(stage_name, award), ...]，顺序与关卡编号一致；awards 可逐关指定奖励，覆盖默认规则"""
+    stage_numbers = range(int(start_stage), int(end_stage) + 1)
+    if awards is not None:
+        if len(awards) != len(stage_numbers):
+            raise ValueError("The number of awards must match the number of stages.")
+        return [(f"关卡 {i}", int(award)) for i, award in zip(stage_numbers, awards)]
+    return [(f"关卡 {i}", stage_award(i, end_stage)) for i in stage_numbers]
+
+
+def create_stages(create_fn, plan, max_workers=DEFAULT_MAX_WORKERS, on_result=None):
+    '''
+    并发调用 create_fn(stage_name, award) 创建 plan 中的阶段，返回值按 plan 顺序排列，
+    因此 results[i] 始终对应 plan[i]（以及排好序的第 i 个答案文件）。
+
+    - 同时在途的请求不超过 max_workers 个
+    - create_fn 抛出异常即视为失败：不再提交新的请求，等在途请求结束后抛出 StageCreationError
+    - on_result(index, stage_name, award, result) 在调用线程中按 plan 顺序回调，可以直接调用 st.*
+    '''
+    max_workers = max(1, int(max_workers))
+    results = [None] * len(plan)
+    done_flags = [False] * len(plan)
+    next_to_submit = 0
+    next_to_emit = 0
+    failure = None
+
+    def emit_ready():
+        nonlocal next_to_emit
+        while next_to_emit < len(plan) and done_flags[next_to_emit]:
+            if on_result is not None:
+                name, award = plan[next_to_emit]
+                on_result(next_to_emit, name, award, results[next_to_emit])
+            next_to_emit += 1
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+        while pending or (failure is None and next_to_submit < len(plan)):
+            # 填满并发窗口；出现失败后停止提交
+            while failure is None and next_to_submit < len(plan) and len(pending) < max_workers:
+                name, award = plan[next_to_submit]
+                pending[submit_in_context(executor, create_fn, name, award)] = next_to_submit
+                next_to_submit += 1
+
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index = pending.pop(future)
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    if failure is None or index < failure[0]:
+                        failure = (index, e)
+                    continue
+                done_flags[index] = True
+
+            if failure is None:
+                emit_ready()
+
+    if failure is not None:
+        # 失败之前已经成功的阶段仍然按顺序回报，方便人工核对
+        if on_result is not None:
+            for index in range(next_to_emit, len(plan)):
+                if done_flags[index]:
+                    name, award = plan[index]
+                    on_result(index, name, award, results[index])
+        index, cause = failure
+        raise StageCreationError(plan[index][0], cause, results)
+
+    return results
@@ -0,0 +1,167 @@
+"""对外请求的追踪：每次 HTTP 请求记录一个 span，按运行 ID 与关卡分组，可导出 JSONL 与 Prometheus 文本"""
+import contextvars
+import json
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+_current_tracer = contextvars.ContextVar('camp_setting_tracer', default=None)
+_current_stage = contextvars.ContextVar('camp_setting_stage', default=None)
+
+# (方法, 路径正则, 端点模板)；未匹配的路径把像 ID 的片段替换为 {id}
+ENDPOINT_TEMPLATES = [
+    ('POST', r'/admin/v2/api/stages', 'POST /admin/v2/api/stages'),
+    ('GET', r'/admin/v2/api/stages', 'GET /admin/v2/api/stages'),
+    ('POST', r'/admin/v2/api/tasks', 'POST /admin/v2/api/tasks'),
+    ('PUT', r'/admin/v2/api/tasks/[^/]+', 'PUT /admin/v2/api/tasks/{id}'),
+    ('GET', r'/api/uptoken', 'GET /api/uptoken'),
+    ('POST', r'/?', 'POST qiniu:/ (form upload)'),
+    ('POST', r'/buckets/[^/]+/objects/[^/]+/uploads', 'POST qiniu:/buckets/{bucket}/objects/{key}/uploads'),
+    ('PUT', r'/buckets/[^/]+/objects/[^/]+/uploads/[^/]+/\d+',
+     'PUT qiniu:/buckets/{bucket}/objects/{key}/uploads/{upload_id}/{part}'),
+    ('POST', r'/buckets/[^/]+/objects/[^/]+/uploads/[^/]+',
+     'POST qiniu:/buckets/{bucket}/objects/{key}/uploads/{upload_id}'),
+]
+
+
+def endpoint_template(method, url):
+    path = re.sub(r'^[a-z]+://[^/]+', '', url).split('?')[0] or '/'
+    for template_method, pattern, template in ENDPOINT_TEMPLATES:
+        if method == template_method and re.fullmatch(pattern, path):
+            return template
+    return f"{method} " + re.sub(r'/(?=[^/]*\d)[0-9A-Za-z_=-]{8,}', '/{id}', path)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, int(round(q * (len(values) - 1)))))]
+
+
+class Tracer:
+    """一次批量运行的全部 span"""
+
+    def __init__(self, run_id=None):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def record(self, method, url, status=None, bytes_sent=0, bytes_received=0, duration=0.0, error=None):
+        span = {
+            "run_id": self.run_id,
+            "stage": _current_stage.get(),
+            "method": method,
+            "endpoint": endpoint_template(method, url),
+            "status": status,
+            "bytes_sent": bytes_sent,
+            "bytes_received": bytes_received,
+            "duration_ms": round(duration * 1000, 3),
+            "start": time.time() - duration,
+            "error": error,
+        }
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def summary(self):
+        """按端点汇总：次数、错误数、p50/p95/总耗时与收发字节数"""
+        groups = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            groups.setdefault(span['endpoint'], []).append(span)
+        rows = []
+        for endpoint, items in sorted(groups.items()):
+            durations = [s['duration_ms'] for s in items]
+            rows.append({
+                "endpoint": endpoint,
+                "count": len(items),
+                "errors": sum(1 for s in items if s['error'] or (s['status'] or 0) >= 400),
+                "p50_ms": round(percentile(durations, 0.5), 1),
+                "p95_ms": round(percentile(durations, 0.95), 1),
+                "total_s": round(sum(durations) / 1000, 3),
+                "bytes_sent": sum(s['bytes_sent'] for s in items),
+                "bytes_received": sum(s['bytes_received'] for s in items),
+            })
+        return rows
+
+    def to_jsonl(self):
+        with self._lock:
+            return "".join(json.dumps(span, ensure_ascii=False) + "\n" for span in self.spans)
+
+    def to_prometheus(self):
+        """Prometheus textfile collector 格式"""
+        def escape(value):
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        def labels(**kv):
+            return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in kv.items()) + "}"
+
+        lines = [
+            "# HELP camp_setting_http_request_duration_seconds Outbound HTTP request duration.",
+            "# TYPE camp_setting_http_request_duration_seconds summary",
+        ]
+        with self._lock:
+            spans = list(self.spans)
+        groups = {}
+        for span in spans:
+            groups.setdefault(span['endpoint'], []).append(span)
+        for endpoint, items in sorted(groups.items()):
+            durations = [s['duration_ms'] / 1000 for s in items]
+            for q in (0.5, 0.95):
+                lines.append(f"camp_setting_http_request_duration_seconds"
+                             f"{labels(run_id=self.run_id, endpoint=endpoint, quantile=q)} {percentile(durations, q):.6f}")
+            lines.append(f"camp_setting_http_request_duration_seconds_sum"
+                         f"{labels(run_id=self.run_id, endpoint=endpoint)} {sum(durations):.6f}")
+            lines.append(f"camp_setting_http_request_duration_seconds_count"
+                         f"{labels(run_id=self.run_id, endpoint=endpoint)} {len(durations)}")
+
+        lines += ["# HELP camp_setting_http_requests_total Outbound HTTP requests by status.",
+                  "# TYPE camp_setting_http_requests_total counter"]
+        counts = {}
+        for span in spans:
+            key = (span['endpoint'], span['status'] if span['status'] is not None else 'error')
+            counts[key] = counts.get(key, 0) + 1
+        for (endpoint, status), count in sorted(counts.items(), key=str):
+            lines.append(f"camp_setting_http_requests_total{labels(run_id=self.run_id, endpoint=endpoint, status=status)} {count}")
+
+        for direction in ('sent', 'received'):
+            lines += [f"# HELP camp_setting_http_bytes_{direction}_total Outbound HTTP bytes {direction}.",
+                      f"# TYPE camp_setting_http_bytes_{direction}_total counter"]
+            for endpoint, items in sorted(groups.items()):
+                total = sum(s[f'bytes_{direction}'] for s in items)
+                lines.append(f"camp_setting_http_bytes_{direction}_total{labels(run_id=self.run_id, endpoint=endpoint)} {total}")
+        return "\n".join(lines) + "\n"
+
+
+def current_tracer():
+    return _current_tracer.get()
+
+
+@contextmanager
+def run_scope(run_id=None):
+    """在当前上下文中开启一次追踪；线程池中的任务需通过 copy_context() 继承"""
+    tracer = Tracer(run_id)
+    token = _current_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current_tracer.reset(token)
+
+
+@contextmanager
+def stage_scope(stage_name):
+    """把其中发出的请求归到某个关卡"""
+    token = _current_stage.set(stage_name)
+    try:
+        yield
+    finally:
+        _current_stage.reset(token)
+
+
+def submit_in_context(executor, fn, *args):
+    """executor.submit 的替代：任务在提交时的 contextvars 上下文中运行（追踪与关卡信息随之传递）"""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
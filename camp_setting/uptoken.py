@@ -0,0 +1,93 @@
+"""七牛云上传凭证缓存：同一个 Cookie/组织共用一个 uptoken，过期前提前刷新"""
+import base64
+import json
+import threading
+import time
+
+# 无法从 token 中解析出过期时间时假定的有效期（七牛默认 3600 秒）
+DEFAULT_TTL = 3600
+# 距离过期不足该秒数时刷新
+REFRESH_MARGIN = 300
+
+
+def token_policy(token):
+    '''
+    解析上传凭证中的 putPolicy。
+    七牛 uptoken 格式为 "AccessKey:Sign:EncodedPutPolicy"，解析失败返回 None。
+    '''
+    try:
+        encoded_policy = token.split(':')[2]
+        padded = encoded_policy + '=' * (-len(encoded_policy) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        return None
+
+
+def token_deadline(token):
+    """上传凭证的过期时间（Unix 时间戳），解析失败返回 None"""
+    try:
+        return int(token_policy(token)['deadline'])
+    except Exception:
+        return None
+
+
+def token_bucket(token):
+    """上传凭证对应的存储空间名，scope 为 "bucket" 或 "bucket:key"；解析失败返回 None"""
+    try:
+        return token_policy(token)['scope'].split(':', 1)[0]
+    except Exception:
+        return None
+
+
+def fetch_uptoken(api):
+    """向 HeyWhale 申请一个私有空间的上传凭证"""
+    token_response = api.get("/api/uptoken?type=private")
+    if token_response.status_code != 200:
+        raise Exception(f"Failed to get uptoken: {token_response.text}")
+    token_response.raise_for_status()
+    return token_response.json().get('uptoken')
+
+
+class UpTokenCache:
+    """按 (Cookie, 组织) 缓存 uptoken；同一个 key 同时只有一个线程去刷新"""
+
+    def __init__(self, default_ttl=DEFAULT_TTL, refresh_margin=REFRESH_MARGIN, clock=time.time):
+        self.default_ttl = default_ttl
+        self.refresh_margin = refresh_margin
+        self.clock = clock
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _fresh(self, entry):
+        return entry is not None and self.clock() < entry[1] - self.refresh_margin
+
+    def get(self, api):
+        key = api.cache_key
+        entry = self._entries.get(key)
+        if self._fresh(entry):
+            return entry[0]
+        with self._key_lock(key):
+            # 等锁期间可能已有其他线程刷新完成
+            entry = self._entries.get(key)
+            if self._fresh(entry):
+                return entry[0]
+            token = fetch_uptoken(api)
+            expires_at = token_deadline(token) or self.clock() + self.default_ttl
+            self._entries[key] = (token, expires_at)
+            return token
+
+    def invalidate(self, api, token=None):
+        """丢弃缓存的 token；传入 token 时只在它仍是当前缓存值时才丢弃，避免误删刚刷新的新 token"""
+        key = api.cache_key
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry is not None and (token is None or entry[0] == token):
+                del self._entries[key]
+
+
+uptoken_cache = UpTokenCache()
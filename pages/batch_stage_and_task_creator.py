@@ -1,193 +1,24 @@
-import requests
-from datetime import datetime, timezone, timedelta
+import time
+from datetime import datetime, timedelta
 import streamlit as st
-import json
-import random
-import string
-import io
-import uuid
-from requests_toolbelt import MultipartEncoder
+from camp_setting.client import get_client
+from camp_setting.files import FileSpool
+from camp_setting.heywhale import HeyWhaleApi
+from camp_setting.jobs import FAILED, SUCCEEDED, get_job_runner
+from camp_setting.journal import RunJournal
+from camp_setting.pipeline import parse_competition_ids, run_camp, run_camps
+from camp_setting.preflight import preflight
+from camp_setting.stages import DEFAULT_MAX_WORKERS
+from camp_setting.scheduler import SkippedError
+from camp_setting.tracing import run_scope
 
-# --- Helper Functions ---
-def generate_random_string(length=10):
-    """生成指定长度的随机字符串"""
-    characters = string.ascii_letters + string.digits
-    return ''.join(random.choice(characters) for _ in range(length))
-
-def generate_time_string(year, month, day, hour, minute, second):
-    '''
-    Generate a string in the format "YYYY-MM-DDTHH:MM:SS.000Z" 
-    The inputs are from Asia/Shanghai timezone.
-    Convert the inputs to UTC timezone
-    '''
-    shanghai_tz = timezone(timedelta(hours=8))
-    dt_shanghai = datetime(year, month, day, hour, minute, second, tzinfo=shanghai_tz)
-    
-    # Convert to UTC timezone
-    dt_utc = dt_shanghai.astimezone(timezone.utc)
-    
-    # Format the datetime as a string in UTC
-    return dt_utc.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-
-# 上传文件到七牛云
-def upload_file_to_qiniu(token, key, file):
-    """上传文件到七牛云"""
-    file_stream = io.BytesIO(file.getvalue())
-    boundary = uuid.uuid4().hex
-    multipart_data = MultipartEncoder(
-        fields={
-            'token': token,
-            'key': key,
-            'file': (file.name, file_stream, 'application/octet-stream')
-        },
-        boundary = boundary
-    )
-    response = requests.post(
-        url='https://up.qbox.me/',
-        data=multipart_data,
-        headers={'Content-Type': multipart_data.content_type}
-    )
-    response.raise_for_status()  # 如果请求失败，抛出异常
-    return response.json()
-# --- API Functions ---
-def create_stage(stage_name, start_datetime, end_datetime, award, competition_id, cookies):
-    url  = 'https://www.heywhale.com/admin/v2/api/stages'
-    data = {"Name": stage_name,
-            "StartDate": start_datetime,
-            "EndDate": end_datetime,
-            "GroupSync": False,
-            "NeedAgreement": False,
-            "AgreementFields": [],
-            "AuthorizeNotice": "",
-            "AuthorizationLock": False,
-            "AwardWhaleCoin": award,
-            "Competition": competition_id}
-    
-    headers = {'Content-Type': 'application/json'}
-    try:
-        response = requests.post(url, headers=headers, json=data, cookies=cookies)
-        response.raise_for_status()  # 如果请求失败，抛出异常
-        return response
-    except requests.exceptions.ConnectionError as e:
-          raise Exception(f"Network connection error: {e}")
-    except requests.exceptions.Timeout as e:
-          raise Exception(f"Request timeout error: {e}")
-    except Exception as e:
-          raise Exception(f"An unexpected error occurred: {e}")
-
-def create_task_and_upload_file(org_id, cookie_str, task_name, start_datetime, end_datetime, stage_id, submission_notice,
-                                 review_daily_limit, answer_file, sample_file=None):
-    """处理创建任务并上传文件的请求"""
-    try:
-        # 创建会话并设置头部
-        session = requests.Session()
-        session.headers.update({
-            'x-kesci-org': org_id,
-            'cookie': cookie_str
-        })
-
-        # 创建任务
-        task_body = {
-            "Name": task_name,
-            "TaskType": "0",
-            "StartDate": start_datetime,
-            "EndDate": end_datetime,
-            "SubmitDisabled": False,
-            "AllowMemberSubmit": True,
-            "ShowLeaderboard": True,
-            "LeaderboardSortType": 0,
-            "Normalization": False,
-            "ShowPrivateLeaderboard": False,
-            "ShowPrivateBestWork": False,
-            "ObjectiveTaskInfo": {"SubmitType": "token", "AcceptExts": []},
-            "Stage": stage_id
-        }
-
-        task_response = session.post("https://www.heywhale.com/admin/v2/api/tasks", json=task_body)
-        if task_response.status_code != 200:
-             raise Exception(f"Task creation failed: {task_response.text}")
-        task_response.raise_for_status()
-        task_data = task_response.json()
-        task_id = task_data["document"]["_id"]
-
-        # 获取上传文件的 token
-        token_response = session.get("https://www.heywhale.com/api/uptoken?type=private")
-        if token_response.status_code != 200:
-             raise Exception(f"Failed to get uptoken: {token_response.text}")
-        token_response.raise_for_status()
-        upload_token = token_response.json().get('uptoken')
-
-        # 上传答案文件
-        random_file_name = generate_random_string()
-        if "." in answer_file.name:
-            answer_ext = answer_file.name.split(".")[-1]
-        else:
-            answer_ext = ""
-        answer_key = f'tasks/{task_id}/answer/{random_file_name}.{answer_ext}'
-        upload_file_to_qiniu(upload_token, answer_key, answer_file)
-
-
-        # 上传示例文件
-        sample_file_name = None
-        sample_ext = None
-        
-        task_body.pop('TaskType')
-        task_body.pop('Stage')
-        # 更新任务信息
-        task_update_body = {
-            **task_body,
-            "SubmissionNotice": submission_notice,
-            "reviewAll": False,
-            "ObjectiveTaskInfo": {
-                "SubmitType": "token",
-                "ReviewLimit": 0,
-                "ReviewDailyLimit": review_daily_limit,
-                "PublicAnswerFileName": answer_file.name,
-                "PublicAnswerFileUrl": f"{random_file_name}.{answer_ext}",
-                "AcceptExts": ["csv"],
-                "ReviewLibs": [{"Lib": "60a0d35cca31cd0017836bfa", "Weight": 1, "ShowScoreDetail": True}]
-            }
-        }
-        if sample_file:
-            sample_file_name = generate_random_string()
-            if "." in sample_file.name:
-                 sample_ext = sample_file.name.split(".")[-1]
-            else:
-                  sample_ext = ""
-            sample_key = f'tasks/{task_id}/sample/{sample_file_name}.{sample_ext}'
-            upload_file_to_qiniu(upload_token, sample_key, sample_file)
-            task_update_body['ObjectiveTaskInfo']['SampleFileName'] = sample_file.name
-            task_update_body['ObjectiveTaskInfo']['SampleFileUrl'] = f'{sample_file_name}.{sample_ext}'
-        # print(json.dumps(task_update_body))
-        update_response = session.put(
-            f'https://www.heywhale.com/admin/v2/api/tasks/{task_id}',
-            json=task_update_body
-        )
-        if update_response.status_code != 200:
-            raise Exception(f"Task update failed: {update_response.text}")
-        update_response.raise_for_status()
-
-        # 返回成功信息
-        return {
-            "msg": "Task created and file uploaded successfully",
-            "id": task_id,
-            "Name": task_name,
-            "answer_file_name": answer_file.name,
-            "sample_file_name": sample_file.name if sample_file else "" ,
-            "sample_file_url": f'{sample_file_name}.{sample_ext}' if sample_file else ""
-        }
-
-    except requests.RequestException as e:
-        return {"error": "External API error", "details": str(e)}, 500
-    except Exception as e:
-        return {"error": "Internal server error", "details": str(e)}, 500
 # --- Streamlit App ---
 def main():
     st.title('批量生成活动阶段、任务')
     
     # --- Input Fields ---
     cookie_string = st.text_area('Cookie', help='Copy the cookie from stages api. e.g.: kesci.client_sig=...; heywhale.sid.v2=...; heywhale.sid.v2.sig=...', placeholder='kesci.client_sig=...; heywhale.sid.v2=...; heywhale.sid.v2.sig=...')
-    competition_id = st.text_input('Competition ID')
+    competition_id = st.text_input('Competition ID', help='多个比赛用逗号或空格分隔，同一套关卡与文件会同时创建到每个比赛')
     org_id = st.text_input("Organization ID (Optional)", value="")
     
     # Use datetime.datetime.now() to calculate the default datetime strings
@@ -198,6 +29,11 @@ def main():
     review_daily_limit = st.number_input("Review Daily Limit", min_value=0, value=10)
     submission_notice = st.text_area("Submission Notice (Markdown)", value="请认真提交，请勿作弊", height=150)
 
+    max_workers = st.number_input("Max Concurrent Requests", min_value=1, max_value=32, value=DEFAULT_MAX_WORKERS, step=1)
+
+    resume = st.checkbox("Resume previous run (skip finished steps)", value=True,
+                         help="按本地操作日志与比赛下已有的阶段跳过已完成的步骤，避免重复创建“关卡 N”")
+
     create_option = st.radio("Create Options", options=["All Stages & Tasks", "Partial Stages & Tasks"])
 
     if create_option == "All Stages & Tasks":
@@ -213,6 +49,7 @@ def main():
     sample_files = st.file_uploader("Upload CSV Sample Files (Optional)", type=["csv"], accept_multiple_files=True)
     
 
+    runner = get_job_runner()
     if st.button('Create Stages and Tasks'):
         
         if not competition_id:
@@ -223,90 +60,162 @@ def main():
            st.error('Please upload Answer Files.')
         else:
              try:
-                # Parse the cookie string into a dictionary
-                cookies = {}
-                for item in cookie_string.split(';'):
-                    item = item.strip()
-                    if not item:
-                        continue
-                    key, value = item.split('=', 1)
-                    cookies[key] = value
-                
                 #Strip the whitespace
-                competition_id = competition_id.strip()
+                competition_ids = parse_competition_ids(competition_id)
                 org_id = org_id.strip()
-                num_answer_files = len(answer_files)
-                num_sample_files = len(sample_files) if sample_files else 0
-                if num_answer_files != num_stages:
-                  st.error("The number of answer files must match the number of stages.")
-                  return
-                if sample_files and num_sample_files != num_stages:
-                    st.error("The number of sample files must match the number of stages.")
-                    return
+                start_datetime, end_datetime = start_datetime.strip(), end_datetime.strip()
 
                 # 对上传的文件列表进行排序
                 answer_files = sorted(answer_files, key=lambda x: x.name)
                 if sample_files:
                     sample_files = sorted(sample_files, key=lambda x: x.name)
 
-                stages_ids = []
-                with st.spinner(f'Creating {num_stages} Stages...'):
-                   for i in range(start_stage, end_stage + 1):
-                        stage_name = f"关卡 {i}"
-                        if i <= 2:
-                            award = 1
-                        elif i < end_stage:
-                            award = i - 1
-                        elif i == end_stage:
-                            award = 6
-                        else:
-                            raise ValueError("Invalid stage number")
-                            
-                        response = create_stage(stage_name, start_datetime, end_datetime, award, competition_id, cookies)
-                            
-                        if response.status_code == 200:
-                            stage_id = response.json()['document']['_id']
-                            stages_ids.append(stage_id)
-                            st.success(f"Stage '{stage_name}' created successfully! Award: {award}, ID: {stage_id}")
-                        else:
-                            st.error(f"Failed to create stage '{stage_name}'. Status code: {response.status_code}. Response: {response.text}")
-                            return  # Stop if stage creation fails
-
-                # 将 cookies 字典转换为字符串
-                cookie_str = "; ".join([f"{key}={value}" for key, value in cookies.items()])
-                with st.spinner(f'Creating {num_stages} Tasks and Uploading Files...'):
-                    for i, stage_num in enumerate(range(start_stage, end_stage + 1)):
-                        task_name = f"关卡 {stage_num}"
-                        sample_file = sample_files[i] if sample_files else None
-                        try:
-                             result = create_task_and_upload_file(
-                                org_id,
-                                cookie_str,
-                                task_name,
-                                start_datetime,
-                                end_datetime,
-                                stages_ids[i],
-                                submission_notice,
-                                int(review_daily_limit),
-                                answer_files[i],
-                                sample_file
-                            )
-
-                             if isinstance(result, tuple) and "error" in result[0]:
-                                st.error(f"Error creating {task_name}: {result[0]['error']}, Details: {result[0]['details']}")
-                             elif "error" in result:
-                                 st.error(f"Error creating {task_name}: {result['error']}, Details: {result['details']}")
-                             else:
-                                st.success(f"{task_name} 已创建, 答案文件：{result['answer_file_name']}, 提交样例：{result['sample_file_name'] if result['sample_file_name'] else '无'}")
-                                # if result['sample_file_name']:
-                                #     st.write(f"提交样例文件地址：{result['sample_file_url']}")
-                        except Exception as e:
-                            st.error(f"Error creating {task_name}: {e}")
-                    st.success(f"{num_stages} 个任务已全部创建成功，请核对 :)")
+                # 预检：并行解析全部 CSV，检查时间、Cookie 与关卡计划，不通过则不发出任何请求
+                with st.spinner("Checking inputs..."):
+                    report = preflight(cookie_string, competition_ids, start_datetime, end_datetime, start_stage,
+                                       end_stage, answer_files, sample_files, max_workers=max_workers)
+                if not report.ok:
+                    show_preflight(report)
+                else:
+                    # 大文件先转存到临时目录，后台任务只引用磁盘副本，上传时按内存映射流式读取；
+                    # 每个关卡的任务结束后删除对应副本，任务结束时删除整个目录
+                    spool = FileSpool()
+                    answer_files = spool.add_all(answer_files, uses=len(competition_ids))
+                    sample_files = spool.add_all(sample_files, uses=len(competition_ids))
+
+                    # Cookie 与组织 ID 只设置一次，所有请求共用进程级连接池
+                    api = HeyWhaleApi(report.cookie_str, org_id)
+
+                    # 在后台线程中运行，页面交互、刷新都不会中断；任务 ID 写入地址栏，其他人打开同一链接也能查看进度
+                    # 多个比赛共用一个调度器与并发上限，各比赛交替推进
+                    title = competition_ids[0] if len(competition_ids) == 1 else f"{len(competition_ids)} 个比赛"
+                    job = runner.submit(f"{title} 关卡 {start_stage}-{end_stage}", run_camp_job,
+                                        api, competition_ids, report.plan,
+                                        start_datetime, end_datetime, submission_notice, int(review_daily_limit),
+                                        answer_files, sample_files, max_workers, resume, spool,
+                                        competition_ids=competition_ids, num_stages=int(num_stages))
+                    st.query_params["job"] = job.id
              except ValueError as e:
                 st.error(f"Error: {e}")
              except Exception as e:
                 st.error(f"An error occurred: {e}")
 
+    jobs = runner.jobs()
+    if not jobs:
+        return
+    job_ids = [job.id for job in jobs]
+    selected = st.query_params.get("job")
+    job_id = st.selectbox("Jobs", job_ids, index=job_ids.index(selected) if selected in job_ids else 0,
+                          format_func=lambda i: job_label(runner.get(i)))
+    st.query_params["job"] = job_id
+    job = runner.get(job_id)
+    # 运行中每秒只刷新进度区域；结束后停止轮询
+    st.fragment(run_every=None if job.done else 1.0)(show_job)(job_id, not job.done)
+
+
+def run_camp_job(job, api, competition_ids, plan, start_datetime, end_datetime, submission_notice,
+                 review_daily_limit, answer_files, sample_files, max_workers, resume, spool):
+    """后台任务：执行一次批量创建（一个或多个比赛），事件写入 job，返回每个关卡一行的结果"""
+    with spool, run_scope() as tracer:
+        job.context['tracer'] = tracer
+        if len(competition_ids) > 1:
+            return run_camps(api, competition_ids, plan, start_datetime, end_datetime, submission_notice,
+                             review_daily_limit, answer_files, sample_files, max_workers=max_workers, resume=resume,
+                             on_event=job.add_event)
+        # 本地操作日志：记录每一步的结果，重跑时跳过已完成的步骤
+        journal = RunJournal.for_competition(competition_ids[0])
+        job.context['journal_path'] = journal.path
+        return run_camp(api, competition_ids[0], plan, start_datetime, end_datetime, submission_notice,
+                        review_daily_limit, answer_files, sample_files, max_workers=max_workers, resume=resume,
+                        journal=journal, on_event=job.add_event)
+
+
+def show_preflight(report):
+    """预检未通过：逐条列出问题，并给出每个文件一行的检查结果"""
+    st.error(f"预检未通过，未发出任何请求，请修正以下 {len(report.errors())} 个问题后重试：")
+    for problem in report.errors():
+        st.write(f"- {problem}")
+    if report.files:
+        st.dataframe([{**row, "columns": ", ".join(row['columns'] or [])} for row in report.files])
+
+
+def job_label(job):
+    # 选项文字不含状态：文字变化会让 selectbox 被当作新控件而重置选择
+    if job is None:
+        return ""
+    return f"{job.title} · {datetime.fromtimestamp(job.created_at).strftime('%H:%M:%S')} · {job.id}"
+
+
+def show_step(event):
+    stage_name, award, result, error = event['stage'], event['award'], event['result'], event['error']
+    # 多个比赛同时运行时，消息前加上比赛 ID
+    prefix = f"{event['competition_id']} / " if event.get('competition_id') else ""
+    stage_name = f"{prefix}{stage_name}"
+    if event['step'] == "reconcile":
+        st.warning(f"{prefix}无法获取比赛已有的阶段列表，仅按本地日志续跑：{error}")
+    elif isinstance(error, SkippedError):
+        return
+    elif event['step'] == "stage":
+        if error is not None:
+            st.error(f"Failed to create stage '{stage_name}'. {error}")
+        elif event['reused']:
+            st.info(f"Stage '{stage_name}' already exists, skipped. ID: {result}")
+        else:
+            st.success(f"Stage '{stage_name}' created successfully! Award: {award}, ID: {result}")
+    elif error is not None:
+        st.error(f"Error creating {stage_name}: {error}")
+    elif event['reused']:
+        st.info(f"{stage_name} 已在之前的运行中创建完成，跳过")
+    else:
+        answer_timing = f"{result['answer_upload_seconds']:.2f}s"
+        sample_timing = f" ({result['sample_upload_seconds']:.2f}s)" if result['sample_file_name'] else ''
+        st.success(f"{stage_name} 已创建, 答案文件：{result['answer_file_name']} ({answer_timing}), 提交样例：{result['sample_file_name'] if result['sample_file_name'] else '无'}{sample_timing}")
+
+
+def show_job(job_id, polling):
+    """任务进度：每个关卡两步（阶段、任务），按已完成的步数显示进度条与逐步结果"""
+    job = get_job_runner().get(job_id)
+    if job is None:
+        st.warning("任务已过期")
+        return
+    if polling and job.done:
+        # 轮询中发现任务结束，整页重跑一次以停止轮询
+        st.rerun()
+
+    events = job.events_since(0)
+    num_stages = job.meta['num_stages'] * len(job.meta['competition_ids'])
+    finished_steps = sum(1 for event in events if event['step'] in ("stage", "task"))
+    elapsed = (job.finished_at or time.time()) - (job.started_at or job.created_at)
+    st.progress(min(1.0, finished_steps / (2 * num_stages)),
+                text=f"{job.title}：{job.status}，{finished_steps}/{2 * num_stages} 步，{elapsed:.0f}s")
+    for event in events:
+        show_step(event)
+
+    if job.status == FAILED:
+        st.error(f"An error occurred: {job.error}")
+    elif job.status == SUCCEEDED:
+        rows = job.result
+        failed = sum(1 for row in rows if row['status'] == "failed")
+        not_started = sum(1 for row in rows if row['status'] == "not_started")
+        if not failed and not not_started:
+            st.success(f"{num_stages} 个任务已全部创建成功，请核对 :)")
+        else:
+            st.warning(f"{failed} 个关卡失败，{not_started} 个关卡未执行，请核对已创建的阶段与任务")
+        # 每个关卡一行（多个比赛时按比赛依次排列）
+        st.dataframe(rows)
+
+    tracer = job.context.get('tracer')
+    if tracer is not None and job.done:
+        # 各类请求的耗时分布，可下载逐请求明细
+        st.write(f"请求耗时（run {tracer.run_id}）：")
+        st.dataframe(tracer.summary())
+        st.download_button("Download spans (JSONL)", tracer.to_jsonl(), f"spans-{tracer.run_id}.jsonl", "application/x-ndjson")
+        st.download_button("Download metrics (Prometheus)", tracer.to_prometheus(), f"camp_setting-{tracer.run_id}.prom", "text/plain")
+
+    if job.context.get('journal_path'):
+        st.caption(f"操作日志：{job.context['journal_path']}")
+    stats = get_client().connection_stats()
+    st.caption(f"HTTP 连接：新建 {stats['new_connections']} 个，复用 {stats['reused_connections']} 次，被限流 {stats['throttled']} 次（进程累计）")
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
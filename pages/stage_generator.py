@@ -1,40 +1,8 @@
-import requests
-from datetime import datetime, timezone, timedelta
 import streamlit as st
-import json
-
-url  = 'https://www.heywhale.com/admin/v2/api/stages'
-
-def generate_time_string(year,month,day, hour, minute, second):
-    '''
-    Generate a string in the format "YYYY-MM-DDTHH:MM:SS.000Z" 
-    The inputs are from Asia/Shanghai timezone.
-    Convert the inputs to UTC timezone
-    '''
-    shanghai_tz = timezone(timedelta(hours=8))
-    dt_shanghai = datetime(year, month, day, hour, minute, second, tzinfo=shanghai_tz)
-    
-    # Convert to UTC timezone
-    dt_utc = dt_shanghai.astimezone(timezone.utc)
-    
-    # Format the datetime as a string in UTC
-    return dt_utc.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-
-def create_stage(stage_name, start_datetime, end_datetime, award, competition_id, cookies):
-    data = {"Name": stage_name,
-            "StartDate": start_datetime,
-            "EndDate": end_datetime,
-            "GroupSync": False,
-            "NeedAgreement": False,
-            "AgreementFields": [],
-            "AuthorizeNotice": "",
-            "AuthorizationLock": False,
-            "AwardWhaleCoin": award,
-            "Competition": competition_id}
-    
-    headers = {'Content-Type': 'application/json'}
-    response = requests.post(url, headers=headers, json=data, cookies=cookies)
-    return response
+from camp_setting.client import get_client
+from camp_setting.heywhale import HeyWhaleApi, create_stage, generate_time_string, parse_cookie_string
+from camp_setting.stages import build_stage_plan, create_stages, StageCreationError, DEFAULT_MAX_WORKERS
+from camp_setting.tracing import run_scope, stage_scope
 
 
 st.title('批量生成活动阶段')
@@ -44,6 +12,7 @@ num_stages = st.number_input('Number of Stages (n)', min_value=1, value=1, step=
 start_datetime = st.text_input(label='Start Datetime', value=generate_time_string(2025, 1, 3, 16, 0, 0))
 end_datetime = st.text_input(label='End Datetime', value=generate_time_string(2025, 1, 7, 16, 0, 0))
 cookie_string = st.text_area('Cookie', help='Copy the cookie from your browser. e.g.: kesci.client_sig=...; heywhale.sid.v2=...; heywhale.sid.v2.sig=...', placeholder='kesci.client_sig=...; heywhale.sid.v2=...; heywhale.sid.v2.sig=...')
+max_workers = st.number_input('Max Concurrent Requests', min_value=1, max_value=32, value=DEFAULT_MAX_WORKERS, step=1)
 
 
 if st.button('Create Stages'):
@@ -55,32 +24,33 @@ if st.button('Create Stages'):
     else:
         try:
             # Parse the cookie string into a dictionary
-            cookies = {}
-            for item in cookie_string.split(';'):
-                item = item.strip()
-                if not item:
-                    continue
-                key, value = item.split('=', 1)
-                cookies[key] = value
-                
-            
-            for i in range(1, num_stages + 1):
-                stage_name = f"关卡 {i}"
-                if i <= 2:
-                    award = 1
-                elif i < num_stages:
-                    award = i - 1
-                elif i == num_stages:
-                    award = 6
-                else:
-                  raise ValueError("Invalid stage number")
-                
-                response = create_stage(stage_name, start_datetime, end_datetime, award, competition_id, cookies)
-                
-                if response.status_code == 200:
-                    st.success(f"Stage '{stage_name}' created successfully! Award: {award}. Response: {response.json()}")
-                else:
-                    st.error(f"Failed to create stage '{stage_name}'. Status code: {response.status_code}. Response: {response.text}")
+            cookies = parse_cookie_string(cookie_string)
+            api = HeyWhaleApi("; ".join([f"{key}={value}" for key, value in cookies.items()]))
+
+            def create_one(stage_name, award):
+                with stage_scope(stage_name):
+                    response = create_stage(api, stage_name, start_datetime, end_datetime, award, competition_id)
+                if response.status_code != 200:
+                    raise Exception(f"Status code: {response.status_code}. Response: {response.text}")
+                return response
+
+            def show_result(index, stage_name, award, response):
+                st.success(f"Stage '{stage_name}' created successfully! Award: {award}. Response: {response.json()}")
+
+            with run_scope() as tracer:
+                try:
+                    create_stages(create_one, build_stage_plan(1, int(num_stages)), max_workers=max_workers, on_result=show_result)
+                except StageCreationError as e:
+                    st.error(f"Failed to create stage '{e.stage_name}'. {e.cause}")
+
+            # 各类请求的耗时分布
+            st.write(f"请求耗时（run {tracer.run_id}）：")
+            st.dataframe(tracer.summary())
+            st.download_button("Download spans (JSONL)", tracer.to_jsonl(), f"spans-{tracer.run_id}.jsonl", "application/x-ndjson")
+            st.download_button("Download metrics (Prometheus)", tracer.to_prometheus(), f"camp_setting-{tracer.run_id}.prom", "text/plain")
+
+            stats = get_client().connection_stats()
+            st.caption(f"HTTP 连接：新建 {stats['new_connections']} 个，复用 {stats['reused_connections']} 次，被限流 {stats['throttled']} 次（进程累计）")
 
         except ValueError as e:
             st.error(f"Error: {e}")
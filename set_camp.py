@@ -1,5 +1,8 @@
+import os
+import time
 import streamlit as st
-import json
+
+from camp_setting.profiling import get_profile_store, profiled, profiling_enabled
 
 # Define the pages as a dictionary
 pages = {
@@ -9,12 +12,51 @@ pages = {
     "学习任务加链接 🚩": "pages/markdown_url_link_app.py",
 }
 
+
+@st.cache_resource(show_spinner=False)
+def load_page(module_path, mtime):
+    """读取并编译页面源码；每个进程、每个文件版本只编译一次（mtime 变化时重新编译）"""
+    with open(module_path, "r", encoding="utf-8") as f:
+        return compile(f.read(), module_path, "exec")
+
+
+def show_profiles(page):
+    """侧边栏：最近几次页面执行中耗时最多的函数，可下载 pstats 与 speedscope 文件做离线火焰图"""
+    profiles = get_profile_store().profiles(page)
+    if not profiles:
+        return
+    with st.sidebar:
+        st.subheader("Profiling")
+        # 选项按“第几次之前”编号，文字不随新的执行变化；默认始终显示最近一次
+        runs_ago = st.selectbox("Page run", range(len(profiles)), key="profile_run",
+                                format_func=lambda i: "latest" if i == 0 else f"{i} run(s) ago")
+        profile = profiles[min(runs_ago, len(profiles) - 1)]
+        sort = st.radio("Sort by", ["cumulative", "self"], horizontal=True, key="profile_sort")
+        st.caption(f"{time.strftime('%H:%M:%S', time.localtime(profile.started_at))} 页面执行 {profile.wall_seconds * 1000:.0f} ms，{len(profile.samples)} 个栈采样"
+                   + ("" if profile.stats is not None else "（cProfile 被其他会话占用，按采样估算）"))
+        st.dataframe(profile.top(sort=sort), hide_index=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(profile.started_at))
+        if profile.stats is not None:
+            st.download_button("Download .pstats", profile.pstats_bytes(), f"{stamp}.pstats",
+                               "application/octet-stream", key="profile_pstats")
+        st.download_button("Download speedscope", profile.speedscope_json(), f"{stamp}.speedscope.json",
+                           "application/json", key="profile_speedscope")
+
+
 # Create the navigation menu using st.navigation
 selected_page = st.select_slider("Select a page", options=list(pages.keys()))
 
-# Get the module path using the selected page and import it
+# Get the module path using the selected page and run its cached code object.
+# 每个页面在独立的命名空间中执行，依赖（pandas、requests 等）由页面自己导入，只在用到该页面时加载
+# 环境变量 CAMP_PROFILE=1 或地址栏 ?profile=1 时剖析页面执行，结果显示在侧边栏
 module_path = pages[selected_page]
 if module_path:
-    with open(module_path, "r", encoding="utf-8") as f:
-        module_code = f.read()
-    exec(module_code)
\ No newline at end of file
+    page_code = load_page(module_path, os.path.getmtime(module_path))
+    if profiling_enabled(st.query_params.get("profile")):
+        try:
+            with profiled(selected_page):
+                exec(page_code, {"__name__": "__main__", "__file__": module_path})
+        finally:
+            show_profiles(selected_page)
+    else:
+        exec(page_code, {"__name__": "__main__", "__file__": module_path})